@@ -1,239 +1,47 @@
+import os
+from bisect import bisect_left, bisect_right
+import queue
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox
-from collections import Counter
+from tkinter import ttk, messagebox, filedialog
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
 
-
-# ---------------- Cache Algorithms (Fixed) ---------------- #
-def fifo(requests, cache_size):
-    cache, q, steps = [], [], []
-    for r in requests:
-        action, replaced = "", None
-        if r not in cache:
-            if len(cache) < cache_size:
-                cache.append(r)
-                q.append(r)
-                action = "MISS - Added"
-            else:
-                replaced = q.pop(0)
-                idx = cache.index(replaced)
-                cache[idx] = r
-                q.append(r)
-                action = f"MISS - Replace {replaced}"
-        else:
-            action = "HIT"
-        steps.append((r, action, list(cache), replaced))
-    return steps
-
-
-def lifo(requests, cache_size):
-    cache, stack, steps = [], [], []
-    for r in requests:
-        action, replaced = "", None
-        if r not in cache:
-            if len(cache) < cache_size:
-                cache.append(r)
-                stack.append(r)
-                action = "MISS - Added"
-            else:
-                replaced = stack.pop(-1)
-                idx = cache.index(replaced)
-                cache[idx] = r
-                stack.append(r)
-                action = f"MISS - Replace {replaced}"
-        else:
-            action = "HIT"
-        steps.append((r, action, list(cache), replaced))
-    return steps
-
-
-def optimal(requests, cache_size):
-    cache, steps = [], []
-    for i, r in enumerate(requests):
-        action, replaced = "", None
-        if r not in cache:
-            if len(cache) < cache_size:
-                cache.append(r)
-                action = "MISS - Added"
-            else:
-                future = requests[i + 1:]
-                farthest, idx = -1, 0
-                for c in cache:
-                    pos = future.index(c) if c in future else float("inf")
-                    if pos > farthest:
-                        farthest, idx = pos, cache.index(c)
-                replaced = cache[idx]
-                cache[idx] = r
-                action = f"MISS - Replace {replaced}"
-        else:
-            action = "HIT"
-        steps.append((r, action, list(cache), replaced))
-    return steps
-
-
-def lru(requests, cache_size):
-    cache, recent, steps = [], [], []
-    for r in requests:
-        action, replaced = "", None
-        if r not in cache:
-            if len(cache) < cache_size:
-                cache.append(r)
-                action = "MISS - Added"
-            else:
-                replaced = recent.pop(0)
-                idx = cache.index(replaced)
-                cache[idx] = r
-                action = f"MISS - Replace {replaced}"
-        else:
-            action = "HIT"
-        if r in recent:
-            recent.remove(r)
-        recent.append(r)
-        steps.append((r, action, list(cache), replaced))
-    return steps
-
-
-def mru(requests, cache_size):
-    cache, recent, steps = [], [], []
-    for r in requests:
-        action, replaced = "", None
-        if r not in cache:
-            if len(cache) < cache_size:
-                cache.append(r)
-                action = "MISS - Added"
-            else:
-                replaced = recent.pop(-1)
-                idx = cache.index(replaced)
-                cache[idx] = r
-                action = f"MISS - Replace {replaced}"
-        else:
-            action = "HIT"
-        if r in recent:
-            recent.remove(r)
-        recent.append(r)
-        steps.append((r, action, list(cache), replaced))
-    return steps
-
-
-# --- تم التعديل هنا: Tree-based Pseudo-LRU ---
-def pseudo_lru(requests, cache_size):
-    """
-    Tree-based Pseudo-LRU Algorithm.
-    Uses a binary tree of bits to point to the pseudo-LRU victim.
-    When a block is accessed, bits on the path to it are flipped to point away.
-    """
-    cache = []
-    steps = []
-    # Tree bits to store directions (0=Left, 1=Right)
-    # Size 4*cache_size ensures we have enough nodes for the tree heap
-    tree_bits = [0] * (cache_size * 4)
-
-    def update_tree(target_idx):
-        # Update path to point AWAY from the accessed item (Make it MRU)
-        node = 0
-        left, right = 0, cache_size
-        while right - left > 1:
-            mid = (left + right) // 2
-            if target_idx < mid:
-                # Target is Left, point arrow Right (1) to protect Left
-                tree_bits[node] = 1
-                node = 2 * node + 1
-                right = mid
-            else:
-                # Target is Right, point arrow Left (0) to protect Right
-                tree_bits[node] = 0
-                node = 2 * node + 2
-                left = mid
-
-    def find_victim():
-        # Follow arrows to find the victim (PLRU item)
-        node = 0
-        left, right = 0, cache_size
-        while right - left > 1:
-            mid = (left + right) // 2
-            if tree_bits[node] == 0:
-                # Arrow points Left, go Left
-                node = 2 * node + 1
-                right = mid
-            else:
-                # Arrow points Right, go Right
-                node = 2 * node + 2
-                left = mid
-        return left
-
-    for r in requests:
-        action, replaced = "", None
-
-        if r in cache:
-            # HIT
-            action = "HIT"
-            idx = cache.index(r)
-            update_tree(idx)  # Protect this item
-        else:
-            if len(cache) < cache_size:
-                # Cache not full
-                cache.append(r)
-                idx = len(cache) - 1
-                action = "MISS - Added"
-                update_tree(idx)  # Protect new item
-            else:
-                # Cache full, need replacement
-                victim_idx = find_victim()
-                replaced = cache[victim_idx]
-                cache[victim_idx] = r
-                action = f"MISS - Replace {replaced}"
-                update_tree(victim_idx)  # Protect new item
-
-        steps.append((r, action, list(cache), replaced))
-
-    return steps
-
-
-def lfu(requests, cache_size):
-    cache, freq, steps = [], {}, []
-    for r in requests:
-        action, replaced = "", None
-        if r not in cache:
-            if len(cache) < cache_size:
-                cache.append(r)
-                action = "MISS - Added"
-            else:
-                least = min(freq[c] for c in cache)
-                candidates = [c for c in cache if freq[c] == least]
-                replaced = candidates[0]
-                idx = cache.index(replaced)
-                cache[idx] = r
-                action = f"MISS - Replace {replaced}"
-            freq[r] = freq.get(r, 0)
-        else:
-            action = "HIT"
-        freq[r] = freq.get(r, 0) + 1
-        steps.append((r, action, list(cache), replaced))
-    return steps
+# The policies are re-exported for scripts that import them from this module.
+from cache_core import (
+    POLICIES, SimulationCancelled, fifo, lifo, optimal, lru, mru, pseudo_lru, lfu,
+    lru_miss_ratio_curve, optimal_miss_ratio_curve, run_policy, simulate_many,
+)
+from cache_analysis import (
+    binned_rate, hit_flags, longest_streaks, lttb, minmax_decimate, occupancy, running_hit_rate,
+)
+from cache_trace import load_trace, parse_key
+import cache_workloads
 
 
 # ---------------- Animated Visualization ---------------- #
 class AnimatedCacheVisualizer(tk.Canvas):
+    MAX_SLOTS = 64  # slots drawn; larger caches only show their first slots
+    MEMORY_ITEMS = 12  # distinct keys drawn in the main memory row
+
     def __init__(self, parent, **kwargs):
         super().__init__(parent, **kwargs)
         self.cache_slots = []
         self.memory_items = []
 
-    def initialize_visualization(self, cache_size, all_requests):
+    def initialize_visualization(self, cache_size, unique_items):
+        """Draw empty slots and the first distinct requested keys (`unique_items`)"""
         self.delete("all")
         self.cache_slots = []
         self.memory_items = []
 
-        unique_items = list(dict.fromkeys(all_requests))
-
         # Main Memory Section
         self.create_text(120, 30, text="💾 MAIN MEMORY",
                          font=("Arial", 14, "bold"), fill="#4ecdc4", anchor="w")
 
         mem_y = 65
-        for i, item in enumerate(unique_items[:12]):
+        for i, item in enumerate(unique_items[:self.MEMORY_ITEMS]):
             x = 120 + (i % 6) * 75
             y = mem_y + (i // 6) * 60
 
@@ -248,7 +56,7 @@ class AnimatedCacheVisualizer(tk.Canvas):
         self.create_text(120, cache_y - 25, text="⚡ CACHE MEMORY",
                          font=("Arial", 14, "bold"), fill="#f39c12", anchor="w")
 
-        for i in range(cache_size):
+        for i in range(min(cache_size, self.MAX_SLOTS)):
             x = 120 + i * 100
             y = cache_y
 
@@ -264,9 +72,14 @@ class AnimatedCacheVisualizer(tk.Canvas):
             self.cache_slots.append({
                 'rect': slot_rect,
                 'text': content_text,
-                'value': None
+                'value': None,
+                'new': False
             })
 
+        if cache_size > self.MAX_SLOTS:
+            self.create_text(120, cache_y + 95, text=f"Showing {self.MAX_SLOTS} of {cache_size} slots",
+                             font=("Arial", 9), fill="#95a5a6", anchor="w")
+
         self.create_text(120, 380, text="📊 STATUS",
                          font=("Arial", 13, "bold"), fill="#9b59b6", anchor="w")
 
@@ -318,6 +131,7 @@ class AnimatedCacheVisualizer(tk.Canvas):
                 self.itemconfig(slot['text'], text=str(value), fill="white",
                                 font=("Arial", 14, "bold"))
 
+                slot['new'] = value == request
                 if value == request:
                     # Newly added item
                     self.itemconfig(slot['rect'], fill="#27ae60", outline="#2ecc71", width=5)
@@ -326,6 +140,7 @@ class AnimatedCacheVisualizer(tk.Canvas):
                     self.itemconfig(slot['rect'], fill="#34495e", outline="#95a5a6", width=3)
             else:
                 slot['value'] = None
+                slot['new'] = False
                 self.itemconfig(slot['text'], text="EMPTY", fill="#7f8c8d")
                 self.itemconfig(slot['rect'], fill="#34495e", outline="#95a5a6", width=3)
 
@@ -344,11 +159,34 @@ class AnimatedCacheVisualizer(tk.Canvas):
         self.after(500, lambda: self.delete(result_text))
         self.after(600, callback)
 
+    def show_state(self, cache_state, request=None):
+        """Jump straight to a cache state without animating; only changed slots are redrawn"""
+        for i, slot in enumerate(self.cache_slots):
+            value = cache_state[i] if i < len(cache_state) else None
+            new = value is not None and value == request
+            if slot['value'] == value and slot['new'] == new:
+                continue
+            slot['value'], slot['new'] = value, new
+            if value is None:
+                self.itemconfig(slot['text'], text="EMPTY", fill="#7f8c8d")
+            else:
+                self.itemconfig(slot['text'], text=str(value), fill="white")
+            if new:
+                self.itemconfig(slot['rect'], fill="#27ae60", outline="#2ecc71", width=5)
+            else:
+                self.itemconfig(slot['rect'], fill="#34495e", outline="#95a5a6", width=3)
+
 
 # ---------------- Analysis Section ---------------- #
 class AnalysisTab:
+    PLOT_POINTS = 1000  # points per plotted series, about the width of a chart in pixels
+
     def __init__(self, parent):
         self.parent = parent
+        # Miss ratio curves cost O(n * sizes) for OPTIMAL, so they are only
+        # computed once their tab is shown, on a worker of their own
+        self.mrc_worker = SimulationWorker(parent.winfo_toplevel())
+        self.mrc_pending = None  # (requests, cache size, unique keys) of the shown run
         self.setup_ui()
 
     def setup_ui(self):
@@ -368,30 +206,78 @@ class AnalysisTab:
         self.detailed_frame = tk.Frame(self.notebook, bg="#2c3e50")
         self.notebook.add(self.detailed_frame, text="🔍 Detailed Analysis")
 
-    def update_analysis(self, algorithm_results, algorithm_name, requests, cache_size):
-        """Update all analysis tabs with new data"""
-        self.update_basic_stats(algorithm_results, algorithm_name, requests, cache_size)
-        self.update_detailed_analysis(algorithm_results, requests, cache_size)
+        # Tab 4: Miss Ratio Curve
+        self.mrc_frame = tk.Frame(self.notebook, bg="#2c3e50")
+        self.notebook.add(self.mrc_frame, text="📉 Miss Ratio Curve")
+        self.mrc_frame.bind("<Map>", lambda event: self.request_mrc())
+
+    def update_analysis(self, algorithm_results, algorithm_name, requests, cache_size, data=None):
+        """Update all analysis tabs with new data (computed here unless `data` is given)"""
+        if data is None:
+            data = self.prepare_analysis(algorithm_results)
+        self.update_basic_stats(data, algorithm_name, cache_size)
+        self.update_detailed_analysis(data, cache_size)
+        self.cancel_mrc()
+        self.mrc_pending = (requests, cache_size, len(data["request_counter"]))
+        self.show_mrc_message("The curves are computed when this tab is opened")
+        if self.mrc_frame.winfo_ismapped():
+            self.request_mrc()
+
+    def prepare_analysis(self, results, cancel=None):
+        """
+        Compute everything the analysis tabs display. Touches no widgets, so
+        it can run on a background thread; `cancel` is polled between phases.
+        """
+        def check():
+            if cancel is not None and cancel():
+                raise SimulationCancelled("analysis")
+
+        # Per-step series straight from the step log columns, then decimated
+        flags = hit_flags(results)
+        bin_starts, bin_hit_rates = binned_rate(flags, self.PLOT_POINTS)
+        running_hit_rates = lttb(running_hit_rate(flags), self.PLOT_POINTS)
+        check()
+
+        cache_states = occupancy(results)
+        average_fill = float(cache_states.mean()) if len(cache_states) else 0.0
+        cache_states = minmax_decimate(cache_states, self.PLOT_POINTS)
+        longest_hit_streak, longest_miss_streak = longest_streaks(flags)
+        check()
+
+        request_counter, _ = results.key_counts()
+
+        return {
+            "total": len(results),
+            "hits": results.metrics.hits,
+            "request_counter": request_counter,
+            "final_cache": results[-1][2] if results else [],
+            "hit_bins": (bin_starts, bin_hit_rates),
+            "running_hit_rates": running_hit_rates,
+            "cache_states": cache_states,
+            "average_fill": average_fill,
+            "longest_hit_streak": longest_hit_streak,
+            "longest_miss_streak": longest_miss_streak,
+        }
 
-    def update_basic_stats(self, results, algo_name, requests, cache_size):
+    def update_basic_stats(self, data, algo_name, cache_size):
         """Update basic statistics tab"""
         for widget in self.stats_frame.winfo_children():
             widget.destroy()
 
         # Calculate statistics
-        total_requests = len(results)
-        hits = sum(1 for r in results if r[1] == "HIT")
+        total_requests = data["total"]
+        hits = data["hits"]
         misses = total_requests - hits
         hit_rate = (hits / total_requests * 100) if total_requests > 0 else 0
         miss_rate = 100 - hit_rate
 
         # Request frequency analysis
-        request_counter = Counter(requests)
+        request_counter = data["request_counter"]
         most_common = request_counter.most_common(3)
         unique_requests = len(request_counter)
 
         # Cache utilization
-        final_cache = results[-1][2] if results else []
+        final_cache = data["final_cache"]
         cache_utilization = (len(final_cache) / cache_size * 100) if cache_size > 0 else 0
 
         # Create statistics display
@@ -454,21 +340,15 @@ class AnalysisTab:
                                                 "Good"] else "#f39c12" if efficiency == "Average" else "#e74c3c").pack(
             pady=10)
 
-    def update_detailed_analysis(self, results, requests, cache_size):
+    def update_detailed_analysis(self, data, cache_size):
         """Update detailed analysis tab"""
         for widget in self.detailed_frame.winfo_children():
             widget.destroy()
 
-        # Calculate hit/miss patterns
-        hit_pattern = [1 if r[1] == "HIT" else 0 for r in results]
-        miss_pattern = [1 if r[1] != "HIT" else 0 for r in results]
-
-        # Calculate running hit rate
-        running_hit_rates = []
-        hits_so_far = 0
-        for i, r in enumerate(results, 1):
-            hits_so_far += 1 if r[1] == "HIT" else 0
-            running_hit_rates.append((hits_so_far / i) * 100)
+        bin_starts, hit_pattern = data["hit_bins"]
+        miss_pattern = 1 - hit_pattern
+        rate_x, running_hit_rates = data["running_hit_rates"]
+        widths = np.diff(np.append(bin_starts, data["total"]))
 
         # Create detailed analysis display
         tk.Label(self.detailed_frame, text="📈 PERFORMANCE OVER TIME",
@@ -478,11 +358,14 @@ class AnalysisTab:
         fig, axes = plt.subplots(2, 2, figsize=(10, 8))
         fig.patch.set_facecolor('#2c3e50')
 
-        # Plot 1: Hit/Miss Pattern
-        axes[0, 0].bar(range(len(hit_pattern)), hit_pattern, color='#2ecc71', label='Hits', alpha=0.6)
-        axes[0, 0].bar(range(len(miss_pattern)), miss_pattern, bottom=hit_pattern,
+        # Plot 1: Hit/Miss Pattern (one bar per request, or the hit share of each bin)
+        axes[0, 0].bar(bin_starts, hit_pattern, width=widths, align='edge',
+                       color='#2ecc71', label='Hits', alpha=0.6)
+        axes[0, 0].bar(bin_starts, miss_pattern, width=widths, align='edge', bottom=hit_pattern,
                        color='#e74c3c', label='Misses', alpha=0.6)
-        axes[0, 0].set_title('Hit/Miss Pattern', color='white', fontsize=12)
+        per_bar = data["total"] / max(1, len(bin_starts))
+        axes[0, 0].set_title('Hit/Miss Pattern' if per_bar == 1 else f'Hit/Miss Pattern (~{per_bar:.0f} requests/bar)',
+                             color='white', fontsize=12)
         axes[0, 0].set_xlabel('Request Number', color='white')
         axes[0, 0].set_ylabel('Status', color='white')
         axes[0, 0].legend()
@@ -490,8 +373,8 @@ class AnalysisTab:
         axes[0, 0].tick_params(colors='white')
 
         # Plot 2: Running Hit Rate
-        axes[0, 1].plot(running_hit_rates, color='#3498db', linewidth=2)
-        axes[0, 1].fill_between(range(len(running_hit_rates)), running_hit_rates, alpha=0.3, color='#3498db')
+        axes[0, 1].plot(rate_x, running_hit_rates, color='#3498db', linewidth=2)
+        axes[0, 1].fill_between(rate_x, running_hit_rates, alpha=0.3, color='#3498db')
         axes[0, 1].set_title('Running Hit Rate', color='white', fontsize=12)
         axes[0, 1].set_xlabel('Request Number', color='white')
         axes[0, 1].set_ylabel('Hit Rate (%)', color='white')
@@ -500,7 +383,7 @@ class AnalysisTab:
         axes[0, 1].grid(True, alpha=0.3)
 
         # Plot 3: Request Frequency
-        request_counter = Counter(requests)
+        request_counter = data["request_counter"]
         items, counts = zip(*request_counter.most_common(8)) if request_counter else ([], [])
         axes[1, 0].bar(items, counts, color='#9b59b6', alpha=0.7)
         axes[1, 0].set_title('Request Frequency (Top 8)', color='white', fontsize=12)
@@ -510,8 +393,8 @@ class AnalysisTab:
         axes[1, 0].tick_params(colors='white')
 
         # Plot 4: Cache State Evolution
-        cache_states = [len(r[2]) for r in results]
-        axes[1, 1].plot(cache_states, color='#f39c12', linewidth=2)
+        fill_x, cache_states = data["cache_states"]
+        axes[1, 1].plot(fill_x, cache_states, color='#f39c12', linewidth=2)
         axes[1, 1].set_title('Cache Occupancy Over Time', color='white', fontsize=12)
         axes[1, 1].set_xlabel('Request Number', color='white')
         axes[1, 1].set_ylabel('Items in Cache', color='white')
@@ -532,10 +415,10 @@ class AnalysisTab:
         summary_frame.pack(fill=tk.X, padx=10, pady=10)
 
         summary_stats = [
-            ("Longest Hit Streak", self.find_longest_streak(hit_pattern)),
-            ("Longest Miss Streak", self.find_longest_streak(miss_pattern)),
-            ("Average Cache Fill", f"{sum(cache_states) / len(cache_states):.1f} items"),
-            ("Final Cache State", ', '.join(map(str, results[-1][2])) if results else "Empty"),
+            ("Longest Hit Streak", data["longest_hit_streak"]),
+            ("Longest Miss Streak", data["longest_miss_streak"]),
+            ("Average Cache Fill", f"{data['average_fill']:.1f} items"),
+            ("Final Cache State", ', '.join(map(str, data["final_cache"])) if data["total"] else "Empty"),
         ]
 
         for i, (label, value) in enumerate(summary_stats):
@@ -549,6 +432,83 @@ class AnalysisTab:
         summary_frame.columnconfigure(0, weight=1)
         summary_frame.columnconfigure(1, weight=1)
 
+    def request_mrc(self):
+        """Start computing the miss ratio curves of the shown run, if still needed"""
+        if self.mrc_pending is None or self.mrc_worker.busy:
+            return
+        requests, cache_size, unique_requests = self.mrc_pending
+
+        def job(progress, cancelled):
+            # LRU is one O(n log n) pass for all sizes; OPTIMAL is O(n * sizes)
+            lru_sizes = max(1, min(unique_requests, 4096))
+            opt_sizes = max(1, min(unique_requests, max(2 * cache_size, 16), 256))
+            progress(0.0, "LRU")
+            lru_curve = lru_miss_ratio_curve(requests, lru_sizes, cancelled)
+            progress(0.5, "OPTIMAL")
+            return lru_curve, optimal_miss_ratio_curve(requests, opt_sizes, cancelled)
+
+        def done(curves):
+            self.mrc_pending = None
+            self.update_mrc(*curves, cache_size)
+
+        self.show_mrc_message("⏳ Computing miss ratio curves...")
+        self.mrc_worker.submit(
+            job, done,
+            lambda fraction, text: self.show_mrc_message(f"⏳ Computing miss ratio curves... {text}"),
+            lambda: self.show_mrc_message("Cancelled; reopen this tab to compute the curves"),
+            lambda error: self.show_mrc_message(f"Could not compute the curves: {error}"))
+
+    def cancel_mrc(self):
+        self.mrc_worker.cancel()
+
+    def show_mrc_message(self, text):
+        for widget in self.mrc_frame.winfo_children():
+            widget.destroy()
+        tk.Label(self.mrc_frame, text=text, font=("Arial", 11, "bold"),
+                 bg="#2c3e50", fg="#95a5a6").pack(pady=40)
+
+    def update_mrc(self, lru_curve, opt_curve, cache_size):
+        """Update miss ratio curve tab (LRU and OPTIMAL for every cache size)"""
+        for widget in self.mrc_frame.winfo_children():
+            widget.destroy()
+
+        lru_sizes, opt_sizes = len(lru_curve), len(opt_curve)
+
+        tk.Label(self.mrc_frame, text="📉 MISS RATIO vs CACHE SIZE",
+                 font=("Arial", 14, "bold"), bg="#2c3e50", fg="#4ecdc4").pack(pady=10)
+
+        fig, ax = plt.subplots(figsize=(8, 6))
+        fig.patch.set_facecolor('#2c3e50')
+        ax.set_facecolor('#34495e')
+
+        ax.plot(range(1, lru_sizes + 1), [m * 100 for m in lru_curve],
+                color='#3498db', linewidth=2, label='LRU')
+        ax.plot(range(1, opt_sizes + 1), [m * 100 for m in opt_curve],
+                color='#2ecc71', linewidth=2, linestyle='--', label='OPTIMAL')
+        ax.axvline(cache_size, color='#f39c12', linestyle=':', label=f'Current size ({cache_size})')
+
+        ax.set_title('Miss Ratio Curve', color='white', fontsize=14)
+        ax.set_xlabel('Cache Size (slots)', color='white', fontsize=12)
+        ax.set_ylabel('Miss Rate (%)', color='white', fontsize=12)
+        ax.set_ylim(0, 105)
+        ax.tick_params(colors='white')
+        ax.grid(True, alpha=0.3)
+        ax.legend()
+
+        plt.tight_layout()
+
+        canvas = FigureCanvasTkAgg(fig, self.mrc_frame)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        # Smallest cache reaching (almost) the best LRU miss rate
+        best = lru_curve[-1]
+        knee = next(size for size, m in enumerate(lru_curve, 1) if m <= best + 0.01)
+        tk.Label(self.mrc_frame,
+                 text=f"LRU reaches its minimum miss rate ({best * 100:.1f}%) "
+                      f"within 1 point at {knee} slots",
+                 font=("Arial", 10, "bold"), bg="#2c3e50", fg="#ecf0f1").pack(pady=5)
+
     def update_comparison(self, all_results):
         """Update algorithm comparison tab"""
         for widget in self.comparison_frame.winfo_children():
@@ -563,18 +523,16 @@ class AnalysisTab:
         algorithms = list(all_results.keys())
         hit_rates = []
 
-        for algo, results in all_results.items():
-            total = len(results)
-            hits = sum(1 for r in results if r[1] == "HIT")
-            hit_rate = (hits / total * 100) if total > 0 else 0
-            hit_rates.append(hit_rate)
+        for algo, metrics in all_results.items():
+            hit_rates.append(metrics.hit_rate)
 
         # Create comparison chart
         fig, ax = plt.subplots(figsize=(8, 6))
         fig.patch.set_facecolor('#2c3e50')
         ax.set_facecolor('#34495e')
 
-        colors = ['#2ecc71', '#3498db', '#9b59b6', '#f39c12', '#e74c3c', '#1abc9c', '#d35400']
+        colors = ['#2ecc71', '#3498db', '#9b59b6', '#f39c12', '#e74c3c', '#1abc9c', '#d35400',
+                  '#16a085', '#8e44ad', '#f1c40f', '#2980b9', '#c0392b', '#7f8c8d', '#27ae60']
         bars = ax.bar(algorithms, hit_rates, color=colors[:len(algorithms)], alpha=0.8)
 
         ax.set_title('Algorithm Comparison - Hit Rates', color='white', fontsize=14, pad=20)
@@ -634,33 +592,298 @@ class AnalysisTab:
         else:
             return "Very Poor"
 
-    def find_longest_streak(self, pattern):
-        """Find the longest streak of 1s in a binary pattern"""
-        max_streak = 0
-        current_streak = 0
 
-        for value in pattern:
-            if value == 1:
-                current_streak += 1
-                max_streak = max(max_streak, current_streak)
+# ---------------- Virtualized History ---------------- #
+class HistoryView(tk.Frame):
+    """
+    Execution history table over a StepLog. Only the ROWS visible steps
+    exist as Treeview items; scrolling re-renders them from the log, so
+    memory and redraw cost do not grow with the trace. Supports
+    jump-to-step, filtering (hits/misses, one key) and searching for the
+    next step that requested or evicted a key.
+    """
+
+    ROWS = 12
+    MAX_CACHE_ITEMS = 32  # longer cache states are shortened in the table
+
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.log = None
+        self.limit = 0  # steps revealed so far
+        self.matches = None  # filtered step indices, None when unfiltered
+        self.top = 0  # position of the first visible row
+        self.follow = True  # keep the newest step in view
+        self.marked = None  # step highlighted by jump/search
+
+        bar = tk.Frame(self, bg="#2c3e50")
+        bar.pack(fill=tk.X, pady=(0, 4))
+        self.show_var = tk.StringVar(value="All")
+        show = ttk.Combobox(bar, textvariable=self.show_var, values=["All", "Misses", "Hits"],
+                            state="readonly", width=7)
+        show.pack(side=tk.LEFT)
+        show.bind("<<ComboboxSelected>>", lambda e: self.apply_filter())
+        tk.Label(bar, text="Key", bg="#2c3e50", fg="#95a5a6").pack(side=tk.LEFT, padx=(6, 2))
+        self.key_entry = tk.Entry(bar, width=7, bg="#34495e", fg="white", insertbackground="white")
+        self.key_entry.pack(side=tk.LEFT)
+        self.key_entry.bind("<Return>", lambda e: self.apply_filter())
+        tk.Button(bar, text="Filter", command=self.apply_filter, bg="#34495e", fg="white",
+                  relief=tk.FLAT).pack(side=tk.LEFT, padx=2)
+
+        bar = tk.Frame(self, bg="#2c3e50")
+        bar.pack(fill=tk.X, pady=(0, 4))
+        tk.Label(bar, text="Step", bg="#2c3e50", fg="#95a5a6").pack(side=tk.LEFT, padx=(0, 2))
+        self.step_entry = tk.Entry(bar, width=8, bg="#34495e", fg="white", insertbackground="white")
+        self.step_entry.pack(side=tk.LEFT)
+        self.step_entry.bind("<Return>", lambda e: self.jump())
+        tk.Button(bar, text="Go", command=self.jump, bg="#34495e", fg="white",
+                  relief=tk.FLAT).pack(side=tk.LEFT, padx=2)
+        tk.Label(bar, text="Find", bg="#2c3e50", fg="#95a5a6").pack(side=tk.LEFT, padx=(6, 2))
+        self.find_entry = tk.Entry(bar, width=7, bg="#34495e", fg="white", insertbackground="white")
+        self.find_entry.pack(side=tk.LEFT)
+        self.find_entry.bind("<Return>", lambda e: self.find_next())
+        tk.Button(bar, text="Next", command=self.find_next, bg="#34495e", fg="white",
+                  relief=tk.FLAT).pack(side=tk.LEFT, padx=2)
+
+        table_frame = tk.Frame(self, bg="#2c3e50")
+        table_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.on_scroll)
+        self.table = ttk.Treeview(
+            table_frame, columns=("Step", "Request", "Action", "Cache"),
+            show="headings", style="History.Treeview", height=self.ROWS
+        )
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.table.heading("Step", text="STEP")
+        self.table.heading("Request", text="REQ")
+        self.table.heading("Action", text="ACTION")
+        self.table.heading("Cache", text="CACHE")
+
+        self.table.column("Step", width=45, anchor=tk.CENTER)
+        self.table.column("Request", width=45, anchor=tk.CENTER)
+        self.table.column("Action", width=90, anchor=tk.CENTER)
+        self.table.column("Cache", width=150, anchor=tk.W)
+
+        self.table.pack(fill=tk.BOTH, expand=True)
+
+        self.table.tag_configure('hit', background='#27ae60', foreground='white')
+        self.table.tag_configure('miss', background='#c0392b', foreground='white')
+        self.table.tag_configure('marked', background='#f39c12', foreground='black')
+
+        self.table.bind("<MouseWheel>", lambda e: self.scroll_by(-1 if e.delta > 0 else 1))
+        self.table.bind("<Button-4>", lambda e: self.scroll_by(-1))
+        self.table.bind("<Button-5>", lambda e: self.scroll_by(1))
+
+        self.status = tk.Label(self, text="", font=("Arial", 8), bg="#2c3e50", fg="#95a5a6")
+        self.status.pack(anchor=tk.W)
+
+    def set_log(self, log):
+        """Show a new run (or nothing, with None); no step is revealed yet."""
+        self.log = log
+        self.limit = 0
+        self.top = 0
+        self.follow = True
+        self.marked = None
+        self.matches = None
+        if log is not None and (self.show_var.get() != "All" or self.key_entry.get().strip()):
+            self.apply_filter()
+        self.render()
+
+    def set_limit(self, limit):
+        """Reveal steps 0..limit-1, scrolling along when following the newest step."""
+        self.limit = limit
+        if self.follow:
+            self.top = max(0, self.count() - self.ROWS)
+        self.render()
+
+    def count(self):
+        if self.matches is None:
+            return self.limit
+        return bisect_right(self.matches, self.limit - 1)
+
+    def step_at(self, pos):
+        return pos if self.matches is None else self.matches[pos]
+
+    def apply_filter(self):
+        if self.log is None:
+            return
+        hit = {"All": None, "Hits": True, "Misses": False}[self.show_var.get()]
+        text = self.key_entry.get().strip()
+        key = parse_key(text) if text else None
+        if hit is None and key is None:
+            self.matches = None
+        else:
+            self.matches = self.log.find_steps(hit, key)
+        self.scroll_to(self.count())  # to the newest matching step
+
+    def scroll_to(self, pos):
+        count = self.count()
+        self.top = max(0, min(pos, count - self.ROWS))
+        self.follow = self.top >= count - self.ROWS
+        self.render()
+
+    def scroll_by(self, rows):
+        self.scroll_to(self.top + rows)
+
+    def on_scroll(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * self.count()))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            self.scroll_by(amount * self.ROWS if args[2] == "pages" else amount)
+
+    def show_step(self, step):
+        """Scroll so that `step` (or the first matching step after it) is visible and mark it."""
+        if self.matches is not None:
+            pos = bisect_left(self.matches, step)
+        else:
+            pos = step
+        self.marked = step
+        self.scroll_to(pos - self.ROWS // 2)
+
+    def jump(self):
+        if self.log is None or not self.limit:
+            return
+        try:
+            step = int(self.step_entry.get()) - 1
+        except ValueError:
+            return
+        self.show_step(max(0, min(step, self.limit - 1)))
+
+    def find_next(self):
+        text = self.find_entry.get().strip()
+        if self.log is None or not text:
+            return
+        start = 0 if self.marked is None else self.marked + 1
+        step = self.log.next_step(parse_key(text), start)
+        if step == -1 and start:
+            step = self.log.next_step(parse_key(text))  # wrap around
+        if step == -1 or step >= self.limit:
+            self.status.config(text=f"{text} not found")
+            return
+        self.show_step(step)
+
+    def render(self):
+        self.table.delete(*self.table.get_children())
+        count = self.count()
+        if self.log is None or not count:
+            self.scrollbar.set(0, 1)
+            self.status.config(text="No matching steps" if self.matches is not None and self.limit else "")
+            return
+        stop = min(self.top + self.ROWS, count)
+        if self.matches is None:
+            rows = zip(range(self.top, stop), self.log[self.top:stop])
+        else:
+            rows = ((i, self.log[i]) for i in map(self.step_at, range(self.top, stop)))
+        for i, (req, action, cache, _) in rows:
+            tag = 'marked' if i == self.marked else 'hit' if action == 'HIT' else 'miss'
+            cache_str = " ".join(f"[{c}]" for c in cache[:self.MAX_CACHE_ITEMS])
+            if len(cache) > self.MAX_CACHE_ITEMS:
+                cache_str += f" … +{len(cache) - self.MAX_CACHE_ITEMS}"
+            self.table.insert("", "end", values=(i + 1, req, action, cache_str), tags=(tag,))
+        self.scrollbar.set(self.top / count, stop / count)
+        shown = "" if self.matches is None else f" ({count} matching)"
+        self.status.config(text=f"Steps {self.step_at(self.top) + 1}-{self.step_at(stop - 1) + 1}"
+                                f" of {self.limit}{shown}")
+
+
+# ---------------- Background Worker ---------------- #
+class SimulationWorker:
+    """
+    Runs one simulation job at a time on a background thread so the Tk main
+    loop never blocks. A job is called as job(progress, cancelled): it may
+    report progress(fraction, text) and should stop (raise
+    SimulationCancelled) once cancelled() returns True. Progress, results
+    and errors come back through a queue polled with root.after, and the
+    handlers run on the main thread. cancel() retires the job at once: its
+    on_cancel handler runs, and anything the job still delivers is dropped.
+    """
+
+    def __init__(self, root, poll_ms=50):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.queue = queue.Queue()
+        self.job_id = 0
+        self.busy = False
+        self._cancel = threading.Event()
+        self._handlers = {}
+
+    def submit(self, job, on_done, on_progress=None, on_cancel=None, on_error=None):
+        self.cancel()
+        self.job_id += 1
+        job_id = self.job_id
+        cancel = self._cancel = threading.Event()
+        self._handlers = {"done": on_done, "progress": on_progress,
+                          "cancelled": on_cancel, "error": on_error}
+
+        def progress(fraction, text=""):
+            self.queue.put((job_id, "progress", (fraction, text)))
+
+        def run():
+            try:
+                result = job(progress, cancel.is_set)
+            except SimulationCancelled:
+                self.queue.put((job_id, "cancelled", None))
+            except Exception as e:  # reported to the UI instead of dying silently
+                self.queue.put((job_id, "error", e))
             else:
-                current_streak = 0
+                self.queue.put((job_id, "done", result))
+
+        self.busy = True
+        threading.Thread(target=run, daemon=True).start()
+        self.root.after(self.poll_ms, self._poll, job_id)
 
-        return max_streak
+    def cancel(self):
+        self._cancel.set()
+        if not self.busy:
+            return
+        # A new id makes _poll() drop whatever the job still reports, even
+        # a result it finished just before noticing the cancel
+        self.job_id += 1
+        self.busy = False
+        handler = self._handlers.get("cancelled")
+        self._handlers = {}
+        if handler is not None:
+            handler()
+
+    def _poll(self, polled_id):
+        if polled_id != self.job_id:
+            return  # the job was cancelled; a newer one has its own poll loop
+        latest_progress = None
+        while True:
+            try:
+                job_id, kind, payload = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if job_id != self.job_id:
+                continue  # leftovers of a cancelled job
+            if kind == "progress":
+                latest_progress = payload
+                continue
+            self.busy = False
+            handler = self._handlers.get(kind)
+            if handler is not None:
+                handler(payload) if kind != "cancelled" else handler()
+            return
+        if latest_progress is not None and self._handlers.get("progress"):
+            self._handlers["progress"](*latest_progress)
+        self.root.after(self.poll_ms, self._poll, polled_id)
 
 
 # ---------------- Main Application ---------------- #
 class CacheSimulatorApp:
+    RECENT_WINDOW = 50  # steps behind the "Recent Rate" stat
+    TURBO_FRAME_MS = 16  # frame interval of turbo playback
+    LOG_LIMIT = 500  # event log lines kept; the history table holds every step
+    PRESET_LENGTH = 40  # requests generated by a workload preset
+
     def __init__(self, root):
         self.root = root
         self.root.title("Advanced Cache Replacement Simulator with Analysis")
         self.root.geometry("1450x900")
         self.root.configure(bg="#1a1a2e")
 
-        self.algorithms = {
-            "FIFO": fifo, "LIFO": lifo, "OPTIMAL": optimal,
-            "LRU": lru, "MRU": mru, "Pseudo-LRU": pseudo_lru, "LFU": lfu
-        }
+        self.algorithms = dict(POLICIES)
 
         self.algo_descriptions = {
             "FIFO": "🔄 First In First Out - Replaces oldest item",
@@ -669,14 +892,29 @@ class CacheSimulatorApp:
             "LRU": "⏰ Least Recently Used - Replaces least recent",
             "MRU": "⚡ Most Recently Used - Replaces most recent",
             "Pseudo-LRU": "🔀 Tree-Based PLRU - Uses tree bits",
-            "LFU": "📊 Least Frequently Used - Replaces least used"
+            "Bit-PLRU": "🔘 Bit PLRU - One MRU bit per slot",
+            "LFU": "📊 Least Frequently Used - Replaces least used",
+            "ARC": "🧭 Adaptive Replacement - Balances recency and frequency",
+            "LIRS": "🛡 LIRS - Keeps keys with short reuse distance",
+            "CLOCK": "🕒 CLOCK - Second chance for referenced items",
+            "SIEVE": "🧹 SIEVE - FIFO with a lazy visited-bit hand",
+            "S3-FIFO": "🚪 S3-FIFO - Small, main and ghost FIFO queues",
+            "W-TinyLFU": "🎟 W-TinyLFU - Admits items by sketched frequency"
         }
 
         self.current_results = []
         self.current_step = 0
         self.is_running = False
+        self.paused = False
+        self.animating = False  # a step animation is in flight
+        self.turbo_job = None  # pending root.after id of the next turbo frame
+        self.shown_step = -1  # step the stats and scrubber currently show
         self.animation_speed = 1000
         self.all_algorithm_results = {}  # Store results for comparison
+        self.trace_requests = None  # Requests loaded from a trace file
+        self.preset_seed = 0  # seed of the last workload preset
+
+        self.worker = SimulationWorker(self.root)
 
         self.setup_styles()
         self.setup_ui()
@@ -746,6 +984,30 @@ class CacheSimulatorApp:
         self.entry_requests.insert("1.0", "1 2 3 4 1 2 3 5 6 7")
         self.entry_requests.pack(padx=10, pady=5)
 
+        # Workload presets fill the sequence above (scaled to the cache size)
+        preset_frame = tk.Frame(parent, bg="#2c3e50")
+        preset_frame.pack(fill=tk.X, padx=10, pady=(0, 4))
+        tk.Label(preset_frame, text="Preset:", font=("Arial", 9),
+                 bg="#2c3e50", fg="#ecf0f1").pack(side=tk.LEFT)
+        self.preset_var = tk.StringVar(value="Custom")
+        preset = ttk.Combobox(preset_frame, textvariable=self.preset_var, state="readonly",
+                              values=list(self.workload_presets(4)), width=20)
+        preset.pack(side=tk.LEFT, padx=4, fill=tk.X, expand=True)
+        preset.bind("<<ComboboxSelected>>", lambda e: self.apply_preset())
+
+        # Trace file (used instead of the sequence above while loaded)
+        trace_frame = tk.Frame(parent, bg="#2c3e50")
+        trace_frame.pack(fill=tk.X, padx=10)
+        tk.Button(trace_frame, text="📂 Load Trace", command=self.load_trace_file,
+                  bg="#34495e", fg="white", font=("Arial", 9, "bold"),
+                  relief=tk.FLAT, cursor="hand2").pack(side=tk.LEFT)
+        tk.Button(trace_frame, text="✕", command=self.clear_trace_file,
+                  bg="#34495e", fg="white", font=("Arial", 9, "bold"),
+                  relief=tk.FLAT, cursor="hand2").pack(side=tk.LEFT, padx=4)
+        self.trace_label = tk.Label(trace_frame, text="No trace loaded", font=("Arial", 8),
+                                    bg="#2c3e50", fg="#95a5a6", anchor=tk.W)
+        self.trace_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
         # Cache size
         tk.Label(parent, text="Cache Size:", font=("Arial", 10, "bold"),
                  bg="#2c3e50", fg="#ecf0f1").pack(pady=(10, 4), padx=10, anchor=tk.W)
@@ -812,7 +1074,7 @@ class CacheSimulatorApp:
         self.stats_frame.pack(padx=10, pady=5, fill=tk.X)
 
         self.stats_labels = {}
-        for stat in ["Hits", "Misses", "Hit Rate", "Progress"]:
+        for stat in ["Hits", "Misses", "Hit Rate", "Recent Rate", "Progress"]:
             frame = tk.Frame(self.stats_frame, bg="#34495e")
             frame.pack(fill=tk.X, padx=6, pady=3)
             tk.Label(frame, text=f"{stat}:", font=("Arial", 9, "bold"),
@@ -823,47 +1085,40 @@ class CacheSimulatorApp:
             self.stats_labels[stat] = label
 
     def create_visualization(self, parent):
-        self.canvas = AnimatedCacheVisualizer(parent, bg="#1a1a2e",
-                                              highlightthickness=0, height=420)
-        self.canvas.pack(fill=tk.BOTH, expand=True)
-
         self.status_label = tk.Label(parent, text="Ready to simulate",
                                      font=("Arial", 10, "bold"), bg="#2c3e50", fg="#4ecdc4",
                                      relief=tk.FLAT, pady=10)
         self.status_label.pack(fill=tk.X, side=tk.BOTTOM)
 
+        # Playback: timeline scrubber and turbo mode
+        playback = tk.Frame(parent, bg="#2c3e50")
+        playback.pack(fill=tk.X, side=tk.BOTTOM)
+        self.scrubber = tk.Scale(playback, from_=1, to=1, orient=tk.HORIZONTAL, showvalue=True,
+                                 bg="#2c3e50", fg="white", troughcolor="#34495e",
+                                 highlightthickness=0, command=self.seek, state=tk.DISABLED)
+        self.scrubber.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=10)
+        self.turbo_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(playback, text="⏩ Turbo", variable=self.turbo_var,
+                       bg="#2c3e50", fg="white", selectcolor="#34495e",
+                       activebackground="#2c3e50", activeforeground="#4ecdc4",
+                       font=("Arial", 9, "bold")).pack(side=tk.LEFT)
+        self.turbo_steps = ttk.Combobox(playback, values=["10", "100", "1000", "10000", "100000"],
+                                        state="readonly", width=7)
+        self.turbo_steps.set("1000")
+        self.turbo_steps.pack(side=tk.LEFT, padx=(4, 2))
+        tk.Label(playback, text="steps/frame", font=("Arial", 9),
+                 bg="#2c3e50", fg="#95a5a6").pack(side=tk.LEFT, padx=(0, 10))
+
+        self.canvas = AnimatedCacheVisualizer(parent, bg="#1a1a2e",
+                                              highlightthickness=0, height=420)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+
     def create_history(self, parent):
         tk.Label(parent, text="📋 EXECUTION HISTORY", font=("Arial", 12, "bold"),
                  bg="#2c3e50", fg="#4ecdc4").pack(pady=10)
 
-        table_frame = tk.Frame(parent, bg="#2c3e50")
-        table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
-
-        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL)
-
-        self.history_table = ttk.Treeview(
-            table_frame, columns=("Step", "Request", "Action", "Cache"),
-            show="headings", style="History.Treeview",
-            yscrollcommand=scrollbar.set, height=12
-        )
-
-        scrollbar.config(command=self.history_table.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-        self.history_table.heading("Step", text="STEP")
-        self.history_table.heading("Request", text="REQ")
-        self.history_table.heading("Action", text="ACTION")
-        self.history_table.heading("Cache", text="CACHE")
-
-        self.history_table.column("Step", width=45, anchor=tk.CENTER)
-        self.history_table.column("Request", width=45, anchor=tk.CENTER)
-        self.history_table.column("Action", width=90, anchor=tk.CENTER)
-        self.history_table.column("Cache", width=150, anchor=tk.W)
-
-        self.history_table.pack(fill=tk.BOTH, expand=True)
-
-        self.history_table.tag_configure('hit', background='#27ae60', foreground='white')
-        self.history_table.tag_configure('miss', background='#c0392b', foreground='white')
+        self.history = HistoryView(parent, bg="#2c3e50")
+        self.history.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
 
         tk.Label(parent, text="📝 EVENT LOG", font=("Arial", 11, "bold"),
                  bg="#2c3e50", fg="#f39c12").pack(pady=(15, 5))
@@ -890,37 +1145,148 @@ class CacheSimulatorApp:
     def add_log(self, msg, color="white"):
         self.event_log.insert(tk.END, msg)
         self.event_log.itemconfig(tk.END, fg=color)
+        if self.event_log.size() > self.LOG_LIMIT:
+            self.event_log.delete(0, self.event_log.size() - self.LOG_LIMIT - 1)
         self.event_log.see(tk.END)
 
-    def start(self):
-        if self.is_running:
+    def load_trace_file(self):
+        path = filedialog.askopenfilename(
+            title="Load Trace",
+            filetypes=[("Traces", "*.txt *.csv *.gz *.bin *.ctrc"), ("All files", "*.*")])
+        if not path or self.is_running or self.worker.busy:
             return
+        name = os.path.basename(path)
+
+        def job(progress, cancelled):
+            return load_trace(path)
+
+        def loaded(requests):
+            self.set_busy(False, "Ready to simulate")
+            self.trace_requests = requests
+            self.trace_label.config(text=f"{name} ({len(requests):,} requests)", fg="#4ecdc4")
+            self.add_log(f"📂 Loaded trace {name}: {len(requests):,} requests", "#4ecdc4")
+
+        def failed(error):
+            self.set_busy(False, "Ready to simulate")
+            messagebox.showerror("Error", f"Could not load trace:\n{error}")
+
+        # Text traces are parsed key by key; keep the window responsive meanwhile
+        self.set_busy(True, f"⏳ Loading {name}...")
+        self.worker.submit(job, loaded, on_cancel=self.job_cancelled, on_error=failed)
+
+    def workload_presets(self, size):
+        """Preset name -> generator of `n` keys (numbered from 1) for a `size`-slot cache"""
+        w = cache_workloads
+        return {
+            "Sequential scan": lambda n, seed: w.sequential(n, 1),
+            "Loop (cache + 1)": lambda n, seed: w.loop(n, size + 1, 1),
+            "Zipf (α = 1)": lambda n, seed: w.zipf(n, 4 * size, 1.0, seed) + 1,
+            "Uniform random": lambda n, seed: w.uniform(n, 3 * size, seed) + 1,
+            "Scan + hot set": lambda n, seed: w.scan_mix(n, size, 2 * size, size, seed=seed) + 1,
+            "Markov walk": lambda n, seed: w.markov(n, 4 * size, jump=0.1, seed=seed) + 1,
+            "Temporal locality": lambda n, seed: w.temporal(n, 4 * size, 0.6, 3, seed=seed) + 1,
+        }
 
+    def apply_preset(self):
+        """Replace the request sequence with a freshly seeded workload"""
+        name = self.preset_var.get()
+        try:
+            size = max(1, int(self.entry_size.get()))
+        except ValueError:
+            size = 4
+        self.preset_seed += 1
+        keys = self.workload_presets(size)[name](self.PRESET_LENGTH, self.preset_seed)
+        self.clear_trace_file()
+        self.entry_requests.delete("1.0", tk.END)
+        self.entry_requests.insert("1.0", " ".join(map(str, keys.tolist())))
+        self.add_log(f"🎲 {name} preset (seed {self.preset_seed})", "#4ecdc4")
+
+    def clear_trace_file(self):
+        self.trace_requests = None
+        self.trace_label.config(text="No trace loaded", fg="#95a5a6")
+
+    def read_inputs(self):
+        """Return (requests, cache size) from the loaded trace or the input box, or None"""
         try:
-            reqs = list(map(int, self.entry_requests.get("1.0", tk.END).split()))
+            if self.trace_requests is not None:
+                reqs = self.trace_requests
+            else:
+                reqs = list(map(int, self.entry_requests.get("1.0", tk.END).split()))
             size = int(self.entry_size.get())
             if size < 1 or len(reqs) == 0:
                 raise ValueError
-        except:
+        except ValueError:
             messagebox.showerror("Error", "Invalid input!")
+            return None
+        return reqs, size
+
+    def set_busy(self, busy, text=""):
+        """Lock the controls while a background job runs; PAUSE doubles as cancel"""
+        self.btn_start.config(state=tk.DISABLED if busy else tk.NORMAL)
+        self.btn_compare.config(state=tk.DISABLED if busy else tk.NORMAL)
+        self.btn_pause.config(state=tk.NORMAL if busy else tk.DISABLED)
+        if text:
+            self.status_label.config(text=text)
+
+    def show_progress(self, fraction, text):
+        self.status_label.config(text=f"⏳ {text} {fraction * 100:.0f}%")
+
+    def job_cancelled(self):
+        self.set_busy(False, "Cancelled")
+        self.add_log("✖ Cancelled", "#f39c12")
+
+    def job_failed(self, error):
+        self.set_busy(False, "Error")
+        messagebox.showerror("Error", f"Simulation failed:\n{error}")
+
+    def start(self):
+        if self.is_running or self.worker.busy:
+            return
+        if self.paused and self.current_step < len(self.current_results):
+            self.resume()
             return
 
+        inputs = self.read_inputs()
+        if inputs is None:
+            return
+        reqs, size = inputs
         algo = self.algo_var.get()
-        self.current_results = self.algorithms[algo](reqs, size)
+
+        def job(progress, cancelled):
+            results = run_policy(algo, reqs, size, cancel=cancelled,
+                                 progress=lambda done, total: progress(done / total, f"Running {algo}..."))
+            progress(1.0, "Analyzing...")
+            analysis = self.analysis_tab.prepare_analysis(results, cancelled)
+            # The first distinct keys, for the main memory row of the canvas
+            shown = results.keys[:AnimatedCacheVisualizer.MEMORY_ITEMS]
+            return results, analysis, shown
+
+        self.analysis_tab.cancel_mrc()
+        self.set_busy(True, f"⏳ Running {algo}...")
+        self.worker.submit(job, lambda result: self.begin_animation(algo, reqs, size, *result),
+                           self.show_progress, self.job_cancelled, self.job_failed)
+
+    def begin_animation(self, algo, reqs, size, results, analysis, shown):
+        """Main-thread half of start(): show the finished run and animate it"""
+        self.current_results = results
         self.current_step = 0
         self.is_running = True
+        self.paused = False
 
-        # Store results for analysis
-        self.all_algorithm_results[algo] = self.current_results
+        # Store hit counters for the comparison
+        self.all_algorithm_results[algo] = self.current_results.metrics
 
         self.btn_start.config(state=tk.DISABLED)
+        self.btn_compare.config(state=tk.NORMAL)
         self.btn_pause.config(state=tk.NORMAL)
 
-        for item in self.history_table.get_children():
-            self.history_table.delete(item)
+        self.history.set_log(self.current_results)
         self.event_log.delete(0, tk.END)
 
-        self.canvas.initialize_visualization(size, reqs)
+        self.canvas.initialize_visualization(size, shown)
+        self.shown_step = 0
+        self.scrubber.config(state=tk.NORMAL, from_=1, to=len(results))
+        self.scrubber.set(1)
 
         self.add_log("▶ Simulation Started", "#4ecdc4")
         self.add_log(f"Algorithm: {algo}", "#95a5a6")
@@ -929,32 +1295,42 @@ class CacheSimulatorApp:
         self.add_log("-" * 35, "#555")
 
         # Update analysis tab
-        self.analysis_tab.update_analysis(self.current_results, algo, reqs, size)
+        self.analysis_tab.update_analysis(self.current_results, algo, reqs, size, analysis)
 
         self.animate_next()
 
     def compare_all(self):
         """Run all algorithms and compare results"""
-        try:
-            reqs = list(map(int, self.entry_requests.get("1.0", tk.END).split()))
-            size = int(self.entry_size.get())
-            if size < 1 or len(reqs) == 0:
-                raise ValueError
-        except:
-            messagebox.showerror("Error", "Invalid input!")
+        if self.is_running or self.worker.busy:
             return
 
-        # Clear previous results
-        self.all_algorithm_results = {}
+        inputs = self.read_inputs()
+        if inputs is None:
+            return
+        reqs, size = inputs
+        algorithms = list(self.algorithms)
 
-        # Run all algorithms
-        for algo_name, algo_func in self.algorithms.items():
-            results = algo_func(reqs, size)
-            self.all_algorithm_results[algo_name] = results
+        def job(progress, cancelled):
+            # One fused pass; only hit counters are kept per algorithm
+            return simulate_many(
+                algorithms, reqs, size, cancel=cancelled,
+                progress=lambda done, total: progress(
+                    done / total, f"Running {len(algorithms)} algorithms..."))
 
+        self.set_busy(True, "⏳ Comparing algorithms...")
+        self.worker.submit(job, self.show_comparison, self.show_progress,
+                           self.job_cancelled, self.job_failed)
+
+    def show_comparison(self, all_results):
+        """Main-thread half of compare_all()"""
+        self.set_busy(False, "⚖ Comparison complete!")
+
+        # Replace previous results
+        self.all_algorithm_results = all_results
+
+        for algo_name, metrics in all_results.items():
             # Log each algorithm's performance
-            hits = sum(1 for r in results if r[1] == "HIT")
-            hit_rate = (hits / len(results) * 100) if results else 0
+            hit_rate = metrics.hit_rate
             self.add_log(f"{algo_name}: {hit_rate:.1f}% hit rate",
                          "#2ecc71" if hit_rate > 50 else "#e74c3c")
 
@@ -963,39 +1339,54 @@ class CacheSimulatorApp:
 
         # Show summary
         best_algo = max(self.all_algorithm_results.items(),
-                        key=lambda x: sum(1 for r in x[1] if r[1] == "HIT"))
-        best_hits = sum(1 for r in best_algo[1] if r[1] == "HIT")
-        best_rate = (best_hits / len(best_algo[1]) * 100)
+                        key=lambda x: x[1].hits)
+        best_rate = best_algo[1].hit_rate
 
         self.add_log(f"🏆 Best: {best_algo[0]} ({best_rate:.1f}%)", "#f39c12")
         self.add_log("⚖ Comparison complete!", "#9b59b6")
 
+    def resume(self):
+        self.paused = False
+        self.is_running = True
+        self.btn_start.config(state=tk.DISABLED)
+        self.btn_pause.config(state=tk.NORMAL)
+        self.add_log(f"▶ Resumed at step {self.current_step + 1}", "#4ecdc4")
+        if not self.animating:  # otherwise after_anim() carries on
+            self.animate_next()
+
+    def show_position(self, index):
+        """Stats, history and scrubber as of step `index`; O(1) in the trace length"""
+        log = self.current_results
+        hits = log.hits_through(index)
+        rate = hits / (index + 1) * 100
+        recent = log.window_hit_rate(index, self.RECENT_WINDOW)
+
+        self.stats_labels["Hits"].config(text=str(hits))
+        self.stats_labels["Misses"].config(text=str(index + 1 - hits))
+        self.stats_labels["Hit Rate"].config(text=f"{rate:.1f}%")
+        self.stats_labels["Recent Rate"].config(text=f"{recent:.1f}%")
+        self.stats_labels["Progress"].config(text=f"{index + 1}/{len(log)}")
+
+        # Reveal the steps in the history table
+        self.history.set_limit(index + 1)
+
+        # Tk reports this move to seek() later; shown_step tells it apart from a drag
+        self.shown_step = index
+        self.scrubber.set(index + 1)
+
     def animate_next(self):
         if not self.is_running or self.current_step >= len(self.current_results):
             self.finish()
             return
+        if self.turbo_var.get():
+            self.turbo_frame()
+            return
 
         step = self.current_results[self.current_step]
         req, action, cache, replaced = step
 
         self.status_label.config(text=f"Processing: {req} | {action}")
-
-        hits = sum(1 for s in self.current_results[:self.current_step + 1] if s[1] == "HIT")
-        misses = self.current_step + 1 - hits
-        rate = (hits / (self.current_step + 1) * 100) if (self.current_step + 1) > 0 else 0
-
-        self.stats_labels["Hits"].config(text=str(hits))
-        self.stats_labels["Misses"].config(text=str(misses))
-        self.stats_labels["Hit Rate"].config(text=f"{rate:.1f}%")
-        self.stats_labels["Progress"].config(text=f"{self.current_step + 1}/{len(self.current_results)}")
-
-        # Add to history table
-        tag = 'hit' if action == 'HIT' else 'miss'
-        cache_str = " ".join([f"[{c}]" for c in cache])
-        item_id = self.history_table.insert("", "end",
-                                            values=(self.current_step + 1, req, action, cache_str),
-                                            tags=(tag,))
-        self.history_table.see(item_id)
+        self.show_position(self.current_step)
 
         # Add to event log
         if action == "HIT":
@@ -1006,43 +1397,95 @@ class CacheSimulatorApp:
             else:
                 self.add_log(f"Step {self.current_step + 1}: MISS {req}, added", "#e74c3c")
 
+        self.animating = True
         self.canvas.animate_request(req, action, cache, replaced, self.after_anim)
 
+    def turbo_frame(self):
+        """Play a batch of steps in one frame: only the state after the batch is drawn"""
+        log = self.current_results
+        last = min(self.current_step + int(self.turbo_steps.get()), len(log)) - 1
+        req, action, cache, _ = log[last]
+        self.canvas.show_state(cache, req)
+        self.show_position(last)
+        self.status_label.config(text=f"⏩ Step {last + 1}/{len(log)} | {req} | {action}")
+        self.current_step = last + 1
+        if self.is_running:
+            self.turbo_job = self.root.after(self.TURBO_FRAME_MS, self.next_turbo_frame)
+
+    def next_turbo_frame(self):
+        self.turbo_job = None
+        self.animate_next()
+
+    def cancel_turbo_frame(self):
+        """Drop the scheduled turbo frame so PAUSE and RESET keep their state"""
+        if self.turbo_job is not None:
+            self.root.after_cancel(self.turbo_job)
+            self.turbo_job = None
+
     def after_anim(self):
+        self.animating = False
         self.current_step += 1
         if self.is_running:
             self.root.after(self.animation_speed, self.animate_next)
 
+    def seek(self, value):
+        """Scrubber callback: jump to a step, rebuilding the cache from the nearest checkpoint"""
+        index = int(float(value)) - 1
+        if index == self.shown_step or not self.current_results:
+            return
+        req, action, cache, _ = self.current_results[index]
+        self.canvas.show_state(cache, req)
+        self.show_position(index)
+        self.status_label.config(text=f"Step {index + 1}: {req} | {action}")
+        # Playback continues with the step after this one
+        self.current_step = index if self.animating else index + 1
+        if not self.is_running and not self.paused:
+            self.paused = True
+            self.btn_start.config(state=tk.NORMAL, text="▶ RESUME")
+
     def pause(self):
+        if self.worker.busy:
+            self.worker.cancel()
+            return
+        self.cancel_turbo_frame()
         self.is_running = False
+        self.paused = True
         self.btn_start.config(state=tk.NORMAL, text="▶ RESUME")
         self.btn_pause.config(state=tk.DISABLED)
         self.status_label.config(text="Paused")
         self.add_log("⏸ Paused", "#f39c12")
 
     def reset(self):
+        self.worker.cancel()
+        self.cancel_turbo_frame()
+        self.analysis_tab.cancel_mrc()
         self.is_running = False
+        self.paused = False
         self.current_step = 0
         self.current_results = []
         self.all_algorithm_results = {}
 
         self.btn_start.config(state=tk.NORMAL, text="▶ START")
+        self.btn_compare.config(state=tk.NORMAL)
         self.btn_pause.config(state=tk.DISABLED)
 
         self.canvas.delete("all")
         self.status_label.config(text="Ready to simulate")
+        self.shown_step = 0
+        self.scrubber.set(1)
+        self.scrubber.config(to=1, state=tk.DISABLED)
 
         for label in self.stats_labels.values():
             label.config(text="0")
 
-        for item in self.history_table.get_children():
-            self.history_table.delete(item)
+        self.history.set_log(None)
         self.event_log.delete(0, tk.END)
 
         self.add_log("↻ Reset Complete", "#e74c3c")
 
     def finish(self):
         self.is_running = False
+        self.paused = False
         self.btn_start.config(state=tk.NORMAL, text="▶ START")
         self.btn_pause.config(state=tk.DISABLED)
         self.status_label.config(text="✅ Simulation Complete!")
@@ -1050,11 +1493,9 @@ class CacheSimulatorApp:
 
         # Calculate final statistics
         if self.current_results:
-            total = len(self.current_results)
-            hits = sum(1 for r in self.current_results if r[1] == "HIT")
-            hit_rate = (hits / total * 100)
-            self.add_log(f"Final Hit Rate: {hit_rate:.2f}%", "#4ecdc4")
-            self.add_log(f"Total Hits: {hits}, Total Misses: {total - hits}", "#95a5a6")
+            metrics = self.current_results.metrics
+            self.add_log(f"Final Hit Rate: {metrics.hit_rate:.2f}%", "#4ecdc4")
+            self.add_log(f"Total Hits: {metrics.hits}, Total Misses: {metrics.misses}", "#95a5a6")
 
 
 if __name__ == "__main__":
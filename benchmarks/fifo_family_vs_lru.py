@@ -0,0 +1,95 @@
+"""
+Hit rate and throughput benchmark: CLOCK, SIEVE and S3-FIFO against LRU.
+
+Every policy runs as a bare engine (no step log) over the same synthetic
+traces, and hit rate and requests/second are reported for each. The
+traces are:
+- Zipf-distributed keys (skewed popularity)
+- the same keys with periodic one-off scans mixed in
+- a loop slightly larger than the cache
+
+    python benchmarks/fifo_family_vs_lru.py
+    python benchmarks/fifo_family_vs_lru.py --sizes 100 1000 --requests 500000 --alpha 0.8
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cache_core import ENGINES  # noqa: E402
+
+POLICIES = [
+    ("LRU", {}),
+    ("FIFO", {}),
+    ("CLOCK", {"bits": 1}),
+    ("CLOCK", {"bits": 2}),
+    ("SIEVE", {}),
+    ("S3-FIFO", {}),
+]
+
+
+# ---------------- Workloads ---------------- #
+def zipf_trace(universe, length, alpha, rng):
+    weights = [1 / (rank ** alpha) for rank in range(1, universe + 1)]
+    cum_weights = list(itertools.accumulate(weights))
+    return rng.choices(range(universe), cum_weights=cum_weights, k=length)
+
+
+def scan_trace(universe, length, alpha, rng, scan_every=5000, scan_length=2000):
+    """Zipf traffic interrupted by scans of keys that are never requested again."""
+    trace = zipf_trace(universe, length, alpha, rng)
+    next_scan_key = universe
+    for start in range(scan_every, length, scan_every + scan_length):
+        trace[start:start] = range(next_scan_key, next_scan_key + scan_length)
+        next_scan_key += scan_length
+    return trace[:length]
+
+
+def loop_trace(cache_size, length):
+    period = int(cache_size * 1.2) + 1
+    return [i % period for i in range(length)]
+
+
+def run(engine, trace, cache_size, options):
+    """Drive an engine and return (hits, seconds)."""
+    start = time.perf_counter()
+    hits = 0
+    for event in engine(trace, cache_size, **options):
+        if event[1]:
+            hits += 1
+    return hits, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--universe", type=int, default=None,
+                        help="distinct keys in the Zipf traces (default: 20 x cache size)")
+    parser.add_argument("--alpha", type=float, default=1.0, help="Zipf skew")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    print(f"{'workload':<8} {'size':>7} {'policy':<14} {'hit rate':>9} {'req/s':>12}")
+    for size in args.sizes:
+        universe = args.universe or 20 * size
+        rng = random.Random(args.seed)
+        workloads = {
+            "zipf": zipf_trace(universe, args.requests, args.alpha, rng),
+            "scan": scan_trace(universe, args.requests, args.alpha, rng),
+            "loop": loop_trace(size, args.requests),
+        }
+        for workload, trace in workloads.items():
+            for name, options in POLICIES:
+                hits, seconds = run(ENGINES[name], trace, size, options)
+                label = name + "".join(f" {k}={v}" for k, v in options.items())
+                rate = len(trace) / seconds if seconds else float("inf")
+                print(f"{workload:<8} {size:>7} {label:<14} {hits / len(trace) * 100:>8.2f}% {rate:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
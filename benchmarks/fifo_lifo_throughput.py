@@ -0,0 +1,115 @@
+"""
+Throughput benchmark: hash-indexed FIFO/LIFO engines vs. the original
+list-scanning implementations.
+
+Both sides are timed as bare engines, without recording a step log, so the
+numbers measure the replacement policy itself. The legacy engines are O(cache_size)
+per request, so they are only run on a prefix of the trace until
+--legacy-budget seconds have elapsed; throughput is reported as
+requests/second either way.
+
+    python benchmarks/fifo_lifo_throughput.py
+    python benchmarks/fifo_lifo_throughput.py --sizes 4 64 4096 --requests 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cache_core import _fifo_events, _lifo_events  # noqa: E402
+
+
+# ---------------- Legacy engines (pre hash-index) ---------------- #
+def legacy_fifo_steps(requests, cache_size):
+    cache, q = [], []
+    for r in requests:
+        action, replaced = "", None
+        if r not in cache:
+            if len(cache) < cache_size:
+                cache.append(r)
+                q.append(r)
+                action = "MISS - Added"
+            else:
+                replaced = q.pop(0)
+                idx = cache.index(replaced)
+                cache[idx] = r
+                q.append(r)
+                action = f"MISS - Replace {replaced}"
+        else:
+            action = "HIT"
+        yield r, action, cache, replaced
+
+
+def legacy_lifo_steps(requests, cache_size):
+    cache, stack = [], []
+    for r in requests:
+        action, replaced = "", None
+        if r not in cache:
+            if len(cache) < cache_size:
+                cache.append(r)
+                stack.append(r)
+                action = "MISS - Added"
+            else:
+                replaced = stack.pop(-1)
+                idx = cache.index(replaced)
+                cache[idx] = r
+                stack.append(r)
+                action = f"MISS - Replace {replaced}"
+        else:
+            action = "HIT"
+        yield r, action, cache, replaced
+
+
+ENGINES = {
+    "FIFO": (_fifo_events, legacy_fifo_steps),
+    "LIFO": (_lifo_events, legacy_lifo_steps),
+}
+
+
+def make_trace(cache_size, length, seed):
+    """Uniform keys over twice the cache size: a steady mix of hits and misses."""
+    rng = random.Random(seed)
+    universe = 2 * cache_size
+    return [rng.randrange(universe) for _ in range(length)]
+
+
+def run(steps_fn, requests, cache_size, budget=None):
+    """Drive an engine and return (requests processed, seconds)."""
+    done = 0
+    start = time.perf_counter()
+    for done, _ in enumerate(steps_fn(requests, cache_size), 1):
+        if budget is not None and done % 256 == 0 and time.perf_counter() - start > budget:
+            break
+    return done, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[4, 64, 1024, 16384, 262144, 1048576])
+    parser.add_argument("--requests", type=int, default=None,
+                        help="trace length (default: max(100000, 3 * cache size))")
+    parser.add_argument("--legacy-budget", type=float, default=2.0,
+                        help="seconds to spend on each legacy run")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    print(f"{'policy':<6} {'size':>9} {'requests':>9} {'new req/s':>12} "
+          f"{'legacy req/s':>13} {'speedup':>8}")
+    for size in args.sizes:
+        length = args.requests or max(100_000, 3 * size)
+        trace = make_trace(size, length, args.seed)
+        for name, (new_fn, legacy_fn) in ENGINES.items():
+            n_new, t_new = run(new_fn, trace, size)
+            n_old, t_old = run(legacy_fn, trace, size, budget=args.legacy_budget)
+            new_rate = n_new / t_new if t_new else float("inf")
+            old_rate = n_old / t_old if t_old else float("inf")
+            print(f"{name:<6} {size:>9} {length:>9} {new_rate:>12,.0f} "
+                  f"{old_rate:>13,.0f} {new_rate / old_rate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Policy benchmark suite: throughput, peak memory and latency of every policy.
+
+Every registered policy runs as a bare engine (no step log) over a grid of
+workload shapes x trace lengths x cache sizes. Each cell reports:
+- requests/second, the median of --repeat timed runs
+- peak memory allocated during a run, measured with tracemalloc
+- per-request latency percentiles, each the median over --repeat
+  separately timed runs, with the cost of reading the clock subtracted
+
+A timed run replays the trace until it has taken at least --min-time
+seconds, so short traces are not timed on a handful of milliseconds.
+
+--save writes the results to a JSON baseline. --baseline compares a run
+against one and flags cells that got slower or bigger by more than
+--threshold. A flagged cell is measured again and only reported when it
+regresses a second time; the exit status is 1 when any cell regressed.
+
+    python benchmarks/policy_suite.py --save baseline.json
+    python benchmarks/policy_suite.py --baseline baseline.json --threshold 0.15
+    python benchmarks/policy_suite.py --policies LRU FIFO --workloads zipf loop --cache-sizes 64
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cache_workloads  # noqa: E402
+from cache_core import ENGINES, check_policies  # noqa: E402
+
+PERCENTILES = (50, 90, 99, 99.9)
+GRID_KEYS = ("workload", "requests", "cache_size", "policy")
+
+
+# ---------------- Workloads ---------------- #
+def make_trace(workload, length, cache_size, seed):
+    """A trace of `length` int keys whose shape is scaled to the cache size."""
+    w = cache_workloads
+    universe = 10 * cache_size
+    if workload == "zipf":
+        keys = w.zipf(length, universe, 0.9, seed)
+    elif workload == "uniform":
+        keys = w.uniform(length, universe, seed)
+    elif workload == "loop":
+        keys = w.loop(length, cache_size + cache_size // 10 + 1)
+    elif workload == "scan_mix":
+        keys = w.scan_mix(length, cache_size, 4 * cache_size, cache_size, seed=seed)
+    elif workload == "temporal":
+        keys = w.temporal(length, universe, 0.7, cache_size / 4, seed=seed)
+    else:
+        raise ValueError(f"unknown workload {workload}")
+    return keys.tolist()
+
+
+WORKLOADS = ("zipf", "uniform", "loop", "scan_mix", "temporal")
+
+
+# ---------------- Measurements ---------------- #
+def throughput(engine, trace, cache_size, repeat, min_time):
+    """Median requests/second over `repeat` runs of at least `min_time` seconds."""
+    rates = []
+    for _ in range(repeat):
+        done, elapsed = 0, 0.0
+        while elapsed < min_time:
+            start = time.perf_counter()
+            for _ in engine(trace, cache_size):
+                pass
+            elapsed += time.perf_counter() - start
+            done += len(trace)
+        rates.append(done / elapsed if elapsed else float("inf"))
+    return statistics.median(rates)
+
+
+def peak_memory(engine, trace, cache_size):
+    """Peak bytes allocated while the engine runs (the trace itself excluded)."""
+    tracemalloc.start()
+    try:
+        for _ in engine(trace, cache_size):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _clock_overhead(samples=10000):
+    clock = time.perf_counter_ns
+    deltas = array("q")
+    for _ in range(samples):
+        t = clock()
+        deltas.append(clock() - t)
+    return statistics.median_low(deltas)
+
+
+def latencies(engine, trace, cache_size, overhead, min_time):
+    """
+    Nanoseconds spent producing each event, over passes of the trace until
+    `min_time` seconds have gone by. The engine is resumed one request at a
+    time between two clock reads, minus the clock's own cost.
+    """
+    clock = time.perf_counter_ns
+    samples = array("q")
+    append = samples.append
+    deadline = clock() + int(min_time * 1e9)
+    while True:
+        step = engine(trace, cache_size).__next__
+        for _ in range(len(trace)):
+            t = clock()
+            step()
+            append(clock() - t - overhead)
+        if clock() >= deadline:
+            return samples
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    n = len(ordered)
+    return {f"p{p:g}": max(0, ordered[min(n - 1, int(p / 100 * n))]) for p in PERCENTILES}
+
+
+def latency_percentiles(engine, trace, cache_size, overhead, repeat, min_time):
+    """Each percentile's median over `repeat` timed runs."""
+    runs = [percentiles(latencies(engine, trace, cache_size, overhead, min_time))
+            for _ in range(repeat)]
+    return {name: statistics.median_low([run[name] for run in runs]) for name in runs[0]}
+
+
+def measure(policy, workload, length, size, trace, args, overhead):
+    """One result row of the grid."""
+    engine = ENGINES[policy]
+    row = {"workload": workload, "requests": length, "cache_size": size, "policy": policy,
+           "req_per_s": round(throughput(engine, trace, size, args.repeat, args.min_time), 1),
+           "peak_bytes": peak_memory(engine, trace, size)}
+    row.update(latency_percentiles(engine, trace, size, overhead, args.repeat, args.min_time))
+    return row
+
+
+# ---------------- Baselines ---------------- #
+def cell_key(row):
+    return tuple(row[k] for k in GRID_KEYS)
+
+
+def compare(rows, baseline, threshold):
+    """
+    Regressions of `rows` against a baseline's rows: throughput that fell,
+    or peak memory / p99 latency that rose, by more than `threshold`.
+    Returns (cell, metric, old, new) tuples.
+    """
+    old_rows = {cell_key(r): r for r in baseline["results"]}
+    regressions = []
+    for row in rows:
+        old = old_rows.get(cell_key(row))
+        if old is None:
+            continue
+        if row["req_per_s"] < old["req_per_s"] * (1 - threshold):
+            regressions.append((cell_key(row), "req_per_s", old["req_per_s"], row["req_per_s"]))
+        for metric in ("peak_bytes", "p99"):
+            if row[metric] > old[metric] * (1 + threshold):
+                regressions.append((cell_key(row), metric, old[metric], row[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--policies", nargs="+", default=list(ENGINES))
+    parser.add_argument("--workloads", nargs="+", default=list(WORKLOADS), choices=WORKLOADS)
+    parser.add_argument("--requests", type=int, nargs="+", default=[10_000, 100_000],
+                        help="trace lengths")
+    parser.add_argument("--cache-sizes", type=int, nargs="+", default=[64, 1024])
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="timed runs per cell (the median counts)")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="seconds each timed run lasts at least, replaying the trace")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="write the results to this JSON baseline")
+    parser.add_argument("--baseline", help="compare against this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative change that counts as a regression (default 0.10)")
+    args = parser.parse_args(argv)
+    try:
+        check_policies(args.policies)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    overhead = _clock_overhead()
+    rows = []
+    print(f"{'workload':<9} {'requests':>9} {'size':>6} {'policy':<11} {'req/s':>11} "
+          f"{'peak KiB':>9} {'p50 ns':>8} {'p90 ns':>8} {'p99 ns':>8} {'p99.9 ns':>9}")
+    for workload in args.workloads:
+        for length in args.requests:
+            for size in args.cache_sizes:
+                trace = make_trace(workload, length, size, args.seed)
+                for policy in args.policies:
+                    row = measure(policy, workload, length, size, trace, args, overhead)
+                    rows.append(row)
+                    print(f"{workload:<9} {length:>9} {size:>6} {policy:<11} {row['req_per_s']:>11,.0f} "
+                          f"{row['peak_bytes'] / 1024:>9,.0f} {row['p50']:>8} {row['p90']:>8} "
+                          f"{row['p99']:>8} {row['p99.9']:>9}", flush=True)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": rows}, f, indent=2)
+            f.write("\n")
+        print(f"saved {len(rows)} results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(rows, baseline, args.threshold)
+        if regressions:
+            # Noise rarely strikes the same cell twice: measure flagged cells again
+            suspects = {cell for cell, *_ in regressions}
+            print(f"re-measuring {len(suspects)} flagged cell(s)", flush=True)
+            rerun = []
+            for workload, length, size, policy in sorted(suspects, key=str):
+                trace = make_trace(workload, length, size, args.seed)
+                rerun.append(measure(policy, workload, length, size, trace, args, overhead))
+            flagged = {(cell, metric) for cell, metric, *_ in regressions}
+            regressions = [r for r in compare(rerun, baseline, args.threshold)
+                           if (r[0], r[1]) in flagged]
+        for cell, metric, old, new in regressions:
+            change = (new - old) / old * 100 if old else float("inf")
+            print(f"REGRESSION {'/'.join(map(str, cell))}: {metric} {old:,} -> {new:,} ({change:+.1f}%)")
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%} "
+              f"against {args.baseline}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Vectorized run metrics and plot decimation for the analysis tabs.
+
+The per-step series of a StepLog (hit flags, running hit rate, cache
+occupancy) are computed with NumPy straight from its columns, then reduced
+to a bounded number of points before plotting: hit rates are binned,
+curves are decimated with min/max buckets or LTTB. Plotting cost therefore
+depends on the plot width, not on the trace length.
+"""
+import numpy as np
+
+from cache_core import StepLog
+
+
+# ---------------- Per-step Series ---------------- #
+def hit_flags(log):
+    """Zero-copy uint8 array of a StepLog's hit flags."""
+    return np.frombuffer(log.hit_flags, dtype=np.uint8)
+
+
+def running_hit_rate(flags):
+    """Hit rate in percent after every step."""
+    return np.cumsum(flags, dtype=np.int64) * 100.0 / np.arange(1, len(flags) + 1)
+
+
+def occupancy(log):
+    """Number of cached items after every step: it grows on misses that evict nothing."""
+    evicted = np.frombuffer(log.evicted_ids, dtype=np.int64)
+    added = (hit_flags(log) == 0) & (evicted == StepLog.NO_KEY)
+    return np.cumsum(added, dtype=np.int64)
+
+
+def run_lengths(flags):
+    """Run-length encoding of a 0/1 series: (values, lengths) of its runs."""
+    flags = np.asarray(flags)
+    if not len(flags):
+        return flags[:0], np.zeros(0, dtype=np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(flags)) + 1))
+    lengths = np.diff(np.append(starts, len(flags)))
+    return flags[starts], lengths
+
+
+def longest_streaks(flags):
+    """(longest hit streak, longest miss streak) of a hit flag series."""
+    values, lengths = run_lengths(flags)
+    hit_runs, miss_runs = lengths[values == 1], lengths[values == 0]
+    return (int(hit_runs.max()) if len(hit_runs) else 0,
+            int(miss_runs.max()) if len(miss_runs) else 0)
+
+
+# ---------------- Decimation ---------------- #
+def binned_rate(flags, bins):
+    """
+    Split the steps into at most `bins` equal runs and return
+    (first step of each bin, hit fraction of each bin). With at least as
+    many bins as steps this is the flag series itself.
+    """
+    n = len(flags)
+    if not n:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    edges = np.unique(np.linspace(0, n, min(bins, n) + 1).astype(np.int64))
+    hits = np.add.reduceat(np.asarray(flags, dtype=np.int64), edges[:-1])
+    return edges[:-1], hits / np.diff(edges)
+
+
+def minmax_decimate(y, points):
+    """
+    Keep the minimum and maximum of each of points // 2 buckets, in step
+    order, so spikes survive. Returns (x, y); short series are returned
+    unchanged.
+    """
+    y = np.asarray(y)
+    n = len(y)
+    if n <= points:
+        return np.arange(n), y
+    buckets = max(1, points // 2)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    offset = np.repeat(starts, np.diff(edges))
+    # argmin/argmax per bucket via a bucket-wise sort key
+    order = np.lexsort((y, offset))
+    first = np.searchsorted(offset[order], starts, side="left")
+    last = np.searchsorted(offset[order], starts, side="right") - 1
+    lo, hi = order[first], order[last]
+    x = np.sort(np.stack([lo, hi], axis=1), axis=1).ravel()
+    return x, y[x]
+
+
+def lttb(y, points, x=None):
+    """
+    Largest-Triangle-Three-Buckets decimation of a curve to `points`
+    points (keeping the first and last). Returns (x, y); short series are
+    returned unchanged.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+    if n <= points or points < 3:
+        return x, y
+
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    chosen = np.empty(points, dtype=np.int64)
+    chosen[0], chosen[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        chosen[i + 1] = a
+    return x[chosen], y[chosen]
@@ -0,0 +1,184 @@
+"""
+Set-associative cache model.
+
+A cache of `sets` x `ways` lines: every address is bucketed into a block of
+`block_size` bytes, the block is mapped to one set, and each set is a small
+fully-associative cache of `ways` lines run by any registered policy (LRU,
+FIFO, Pseudo-LRU, ...).
+
+The address -> block -> set mapping is computed for the whole trace at
+once (with NumPy when it is installed), the trace is split into one
+sub-trace per set with a single stable sort, and each set's policy then
+runs over its own sub-trace. Results are scattered back to trace order.
+
+    cache = SetAssociativeCache(sets=64, ways=8, block_size=64, policy="LRU")
+    result = cache.run(addresses)
+    result.metrics.hit_rate
+"""
+from array import array
+
+from cache_core import ENGINES, RunningMetrics, check_policies
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional for the headless tools
+    np = None
+
+INDEX_FUNCTIONS = ("modulo", "bits", "hash")
+_GOLDEN = 0x9E3779B97F4A7C15  # Fibonacci hashing multiplier
+_MASK64 = (1 << 64) - 1
+
+
+def _log2(n):
+    if n < 1 or n & (n - 1):
+        return None
+    return n.bit_length() - 1
+
+
+class SetAssociativeResult:
+    """
+    Outcome of SetAssociativeCache.run(), in trace order: `hit_flags`
+    (bytearray), `set_ids` and `ways` (array("i"), the way that served or
+    received each request), plus per-set `set_requests` / `set_hits`
+    counts and overall `metrics`.
+    """
+
+    def __init__(self, sets, count):
+        self.hit_flags = bytearray(count)
+        self.set_ids = array("i", bytes(4 * count))
+        self.ways = array("i", bytes(4 * count))
+        self.set_requests = array("q", bytes(8 * sets))
+        self.set_hits = array("q", bytes(8 * sets))
+        self.metrics = RunningMetrics()
+
+    def set_hit_rate(self, s):
+        """Hit rate of set `s` in percent."""
+        n = self.set_requests[s]
+        return (self.set_hits[s] / n * 100) if n else 0
+
+    def __repr__(self):
+        return f"SetAssociativeResult({self.metrics!r}, sets={len(self.set_requests)})"
+
+
+class SetAssociativeCache:
+    """
+    Geometry and policy of a set-associative cache.
+
+    block_size   -- bytes per line; addresses are divided by it (a shift
+                    when it is a power of two)
+    index        -- how a block picks its set:
+                    "modulo" block % sets,
+                    "bits"   the log2(sets) block bits above `index_shift`
+                             (sets must be a power of two),
+                    "hash"   Fibonacci hash of the block, modulo sets
+    policy       -- any name in cache_core.ENGINES; extra keyword options
+                    are passed to its engine
+    """
+
+    def __init__(self, sets, ways, block_size=1, index="modulo", policy="LRU",
+                 index_shift=0, **options):
+        if sets < 1 or ways < 1 or block_size < 1:
+            raise ValueError("sets, ways and block size must be at least 1")
+        if index not in INDEX_FUNCTIONS:
+            raise ValueError(f"Unknown index function {index}; choose from {', '.join(INDEX_FUNCTIONS)}")
+        if index == "bits" and _log2(sets) is None:
+            raise ValueError("bit-slice indexing needs a power-of-two number of sets")
+        check_policies([policy])
+        self.sets = sets
+        self.ways = ways
+        self.block_size = block_size
+        self.index = index
+        self.index_shift = index_shift
+        self.policy = policy
+        self.options = options
+
+    @property
+    def capacity(self):
+        """Total number of lines (sets x ways)."""
+        return self.sets * self.ways
+
+    def __repr__(self):
+        return (f"SetAssociativeCache(sets={self.sets}, ways={self.ways}, "
+                f"block_size={self.block_size}, index={self.index!r}, policy={self.policy!r})")
+
+    # ---------------- Address Mapping ---------------- #
+    def block_of(self, address):
+        return address // self.block_size
+
+    def set_of_block(self, block):
+        if self.index == "modulo":
+            return block % self.sets
+        if self.index == "bits":
+            return (block >> self.index_shift) & (self.sets - 1)
+        return (((block * _GOLDEN) & _MASK64) >> 32) % self.sets
+
+    def map(self, addresses):
+        """
+        Blocks and set indices of a whole trace of non-negative integer
+        addresses, as two sequences: NumPy arrays when NumPy is installed,
+        arrays otherwise.
+        """
+        if np is not None:
+            addresses = np.asarray(addresses, dtype=np.uint64)
+            shift = _log2(self.block_size)
+            if shift is not None:
+                blocks = addresses >> np.uint64(shift)
+            else:
+                blocks = addresses // np.uint64(self.block_size)
+            if self.index == "modulo":
+                sets = blocks % np.uint64(self.sets)
+            elif self.index == "bits":
+                sets = (blocks >> np.uint64(self.index_shift)) & np.uint64(self.sets - 1)
+            else:
+                with np.errstate(over="ignore"):
+                    mixed = blocks * np.uint64(_GOLDEN)
+                sets = (mixed >> np.uint64(32)) % np.uint64(self.sets)
+            return blocks, sets.astype(np.int64)
+        blocks = array("Q", (self.block_of(a) for a in addresses))
+        return blocks, array("q", (self.set_of_block(b) for b in blocks))
+
+    def _partition(self, sets):
+        """Request indices of each set, in trace order: {set: indices}."""
+        if np is not None:
+            order = np.argsort(sets, kind="stable")
+            starts = np.flatnonzero(np.diff(sets[order])) + 1
+            groups = np.split(order, starts)
+            return {int(sets[g[0]]): g for g in groups if len(g)}
+        groups = {}
+        for i, s in enumerate(sets):
+            groups.setdefault(s, array("q")).append(i)
+        return groups
+
+    # ---------------- Simulation ---------------- #
+    def run(self, addresses):
+        """Simulate the cache over a trace of addresses; return a SetAssociativeResult."""
+        blocks, sets = self.map(addresses)
+        count = len(blocks)
+        result = SetAssociativeResult(self.sets, count)
+        engine = ENGINES[self.policy]
+        hit_flags, set_ids, ways = result.hit_flags, result.set_ids, result.ways
+        for s, indices in self._partition(sets).items():
+            if np is not None:
+                sub_trace = blocks[indices].tolist()
+                indices = indices.tolist()
+            else:
+                sub_trace = [blocks[i] for i in indices]
+            hits = 0
+            for i, (_, hit, way, _) in zip(indices, engine(sub_trace, self.ways, **self.options)):
+                set_ids[i] = s
+                ways[i] = way
+                if hit:
+                    hit_flags[i] = 1
+                    hits += 1
+            result.set_requests[s] = len(indices)
+            result.set_hits[s] += hits
+        result.metrics.requests = count
+        result.metrics.hits = sum(result.set_hits)
+        return result
+
+
+def simulate_set_associative(addresses, sets, ways, policy="LRU", block_size=1,
+                             index="modulo", **options):
+    """Run a SetAssociativeCache over `addresses`; return its overall RunningMetrics."""
+    cache = SetAssociativeCache(sets, ways, block_size, index, policy, **options)
+    return cache.run(addresses).metrics
@@ -0,0 +1,164 @@
+"""
+Headless batch runner for the cache simulator.
+
+Runs one or more policies against a trace file for a list of cache sizes
+and prints hit/miss statistics as a table, JSON or CSV. Only the GUI-free
+core is imported, so it starts in milliseconds on machines without a
+display.
+
+    python cache_cli.py trace.txt --policy LRU FIFO --sizes 4 8 16
+    python cache_cli.py trace.bin --policy LRU --sizes 1024 65536
+    python cache_cli.py requests.csv.gz --column key --policy LFU --sizes 512
+    python cache_cli.py trace.txt --policy all --sizes 64 256 --format json -o results.json
+    python cache_cli.py trace.bin --policy all --sizes 64 128 256 512 1024 --jobs 0
+    cat trace.txt | python cache_cli.py - --policy OPTIMAL --sizes 32 --format csv
+    python cache_cli.py trace.bin --policy all --sizes 65536 --sample-rate 0.01
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+
+from cache_core import ENGINES, check_policies, simulate
+from cache_trace import is_binary_trace, load_trace
+
+FIELDS = ["policy", "cache_size", "requests", "hits", "misses", "hit_rate", "seconds"]
+SAMPLED_FIELDS = FIELDS + ["error"]
+
+
+def run_batch(requests, policies, sizes):
+    """Yield one result row per (policy, cache size)."""
+    for policy in policies:
+        for size in sizes:
+            start = time.perf_counter()
+            metrics = simulate(policy, requests, size)
+            yield {
+                "policy": policy,
+                "cache_size": size,
+                "requests": metrics.requests,
+                "hits": metrics.hits,
+                "misses": metrics.misses,
+                "hit_rate": round(metrics.hit_rate, 4),
+                "seconds": round(time.perf_counter() - start, 6),
+            }
+
+
+def run_sampled(sample, policies, sizes):
+    """
+    Yield one estimated result row per (policy, cache size) from a
+    SpatialSample; hits and misses are scaled to the full trace and
+    `error` is the 95% error bound of the hit rate, in points.
+    """
+    for policy in policies:
+        for size in sizes:
+            start = time.perf_counter()
+            estimate = sample.simulate(policy, size)
+            hits = round(estimate.hit_rate / 100 * sample.total)
+            yield {
+                "policy": policy,
+                "cache_size": size,
+                "requests": sample.total,
+                "hits": hits,
+                "misses": sample.total - hits,
+                "hit_rate": round(estimate.hit_rate, 4),
+                "seconds": round(time.perf_counter() - start, 6),
+                "error": round(estimate.error, 4),
+            }
+
+
+def write_rows(rows, fmt, out, fields=FIELDS):
+    if fmt == "json":
+        json.dump(list(rows), out, indent=2)
+        out.write("\n")
+    elif fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+    else:
+        sampled = "error" in fields
+        error = f"{'± ERROR':>9}" if sampled else ""
+        out.write(f"{'POLICY':<12}{'SIZE':>10}{'REQUESTS':>12}{'HITS':>12}"
+                  f"{'MISSES':>12}{'HIT RATE':>10}{error}{'TIME':>10}\n")
+        for row in rows:
+            error = f"{row['error']:>8.2f}%" if sampled else ""
+            out.write(f"{row['policy']:<12}{row['cache_size']:>10}{row['requests']:>12}"
+                      f"{row['hits']:>12}{row['misses']:>12}{row['hit_rate']:>9.2f}%"
+                      f"{error}{row['seconds']:>9.3f}s\n")
+            out.flush()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Run cache replacement policies over a trace without the GUI.")
+    parser.add_argument("trace", help="binary trace, whitespace/CSV text trace "
+                                      "(optionally gzipped), or - for stdin")
+    parser.add_argument("--column", help="CSV column (index or header name) holding the key")
+    parser.add_argument("--delimiter", default=",", help="CSV delimiter")
+    parser.add_argument("--header", action=argparse.BooleanOptionalAction,
+                        help="whether the first CSV row is a header (default: detect)")
+    parser.add_argument("-p", "--policy", nargs="+", default=["LRU"],
+                        help=f"policies to run ({', '.join(ENGINES)}) or 'all'")
+    parser.add_argument("-s", "--sizes", type=int, nargs="+", default=[4],
+                        help="cache sizes to simulate")
+    parser.add_argument("-f", "--format", choices=["table", "json", "csv"], default="table")
+    parser.add_argument("-o", "--output", help="write results to this file instead of stdout")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="worker processes; 0 uses every core (results arrive as jobs finish)")
+    sampling = parser.add_mutually_exclusive_group()
+    sampling.add_argument("--sample-rate", type=float,
+                          help="estimate results from a SHARDS spatial sample of this fraction of keys")
+    sampling.add_argument("--sample-keys", type=int,
+                          help="estimate results from a spatial sample of at most this many keys")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    policies = list(ENGINES) if [p.lower() for p in args.policy] == ["all"] else args.policy
+    try:
+        check_policies(policies)
+    except ValueError as e:
+        parser.error(str(e))
+    if any(size < 1 for size in args.sizes):
+        parser.error("cache sizes must be at least 1")
+
+    column = int(args.column) if args.column and args.column.isdigit() else args.column
+    requests = load_trace(args.trace, column, args.delimiter, args.header)
+    if not requests:
+        parser.error("the trace is empty")
+
+    if args.sample_rate is not None and not 0 < args.sample_rate <= 1:
+        parser.error("--sample-rate must be in (0, 1]")
+    if args.sample_keys is not None and args.sample_keys < 1:
+        parser.error("--sample-keys must be at least 1")
+
+    fields = FIELDS
+    if args.sample_rate is not None or args.sample_keys is not None:
+        from cache_shards import SpatialSample
+
+        sample = SpatialSample(requests, rate=args.sample_rate, max_keys=args.sample_keys)
+        rows, fields = run_sampled(sample, policies, args.sizes), SAMPLED_FIELDS
+    elif args.jobs == 1:
+        rows = run_batch(requests, policies, args.sizes)
+    else:
+        # multiprocessing is slow to import; only load it for parallel runs
+        from cache_sweep import sweep
+
+        # Binary traces are mapped by each worker; others go through shared memory
+        source = args.trace if is_binary_trace(args.trace) else requests
+        rows = ({k: v for k, v in row.items() if k != "trace"}
+                for row in sweep(source, policies, args.sizes, workers=args.jobs or None))
+    if args.output:
+        with open(args.output, "w", newline="") as out:
+            write_rows(rows, args.format, out, fields)
+    else:
+        write_rows(rows, args.format, sys.stdout, fields)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
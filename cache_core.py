@@ -0,0 +1,1659 @@
+"""
+GUI-free simulation core: replacement policies, the StepLog result type,
+streaming simulation and miss ratio curves. Only the standard library is
+imported here, so this module is cheap to load on headless machines.
+"""
+import heapq
+import zlib
+from itertools import compress, islice
+from operator import itemgetter
+from array import array
+from collections import Counter, OrderedDict, deque
+
+
+# ---------------- Step Log ---------------- #
+class StepLog:
+    """
+    Compact record of a simulation run.
+
+    Each request is stored as one row of columnar arrays (interned request
+    id, hit flag, slot index, evicted id) instead of a full copy of the
+    cache, and the cache contents are checkpointed every `checkpoint_every`
+    steps. Indexing and iteration still yield the usual
+    (request, action, cache, replaced) tuples, rebuilding the cache from the
+    nearest checkpoint on demand.
+
+    `metrics` is a RunningMetrics of the whole run, updated as steps are
+    appended; hits_through() and window_hit_rate() give the same numbers as
+    of any earlier step, and key_counts() the per-key counters.
+    """
+
+    NO_KEY = -1
+
+    def __init__(self, cache_size, checkpoint_every=None, keys=None, key_ids=None):
+        self.cache_size = cache_size
+        # Replay cost is O(checkpoint_every); checkpoint memory stays O(n).
+        self.checkpoint_every = checkpoint_every or max(256, cache_size)
+        # Logs of one trace may share an interning table (see intern_keys())
+        self.keys = [] if keys is None else keys  # interned id -> key
+        self._ids = {} if key_ids is None else key_ids  # key -> interned id
+        self.request_ids = array("q")
+        self.hit_flags = bytearray()
+        self.slots = array("i")
+        self.evicted_ids = array("q")
+        self._checkpoints = []  # cache ids before step j * checkpoint_every
+        self._checkpoint_hits = array("q")  # hits before step j * checkpoint_every
+        self._cache = []  # live cache ids
+        self.metrics = RunningMetrics()
+
+    @classmethod
+    def from_events(cls, events, cache_size, checkpoint_every=None):
+        """Record every (request, hit, slot, replaced) event of an engine."""
+        log = cls(cache_size, checkpoint_every)
+        append = log.append
+        for request, hit, slot, replaced in events:
+            append(request, hit, slot, replaced)
+        return log
+
+    def _intern(self, key):
+        rid = self._ids.get(key)
+        if rid is None:
+            rid = self._ids[key] = len(self.keys)
+            self.keys.append(key)
+        return rid
+
+    def append(self, request, hit, slot, replaced=None):
+        """Record one request served from (or loaded into) cache slot `slot`."""
+        self.append_id(self._intern(request), hit, slot,
+                       self.NO_KEY if replaced is None else self._ids[replaced])
+
+    def append_id(self, rid, hit, slot, evicted_id=NO_KEY):
+        """append() for keys already interned in this log's key table."""
+        if len(self.hit_flags) % self.checkpoint_every == 0:
+            self._checkpoints.append(array("q", self._cache))
+            self._checkpoint_hits.append(self.metrics.hits)
+        self.request_ids.append(rid)
+        self.slots.append(slot)
+        metrics = self.metrics
+        metrics.requests += 1
+        if hit:
+            metrics.hits += 1
+            self.hit_flags.append(1)
+            self.evicted_ids.append(self.NO_KEY)
+            return
+        self.hit_flags.append(0)
+        self.evicted_ids.append(evicted_id)
+        if slot == len(self._cache):
+            self._cache.append(rid)
+        else:
+            self._cache[slot] = rid
+
+    def __len__(self):
+        return len(self.hit_flags)
+
+    def __repr__(self):
+        return f"StepLog(steps={len(self)}, cache_size={self.cache_size})"
+
+    def _apply(self, ids, j):
+        if not self.hit_flags[j]:
+            slot, rid = self.slots[j], self.request_ids[j]
+            if slot == len(ids):
+                ids.append(rid)
+            else:
+                ids[slot] = rid
+
+    def _ids_at(self, index):
+        start = index - index % self.checkpoint_every
+        ids = list(self._checkpoints[index // self.checkpoint_every])
+        for j in range(start, index + 1):
+            self._apply(ids, j)
+        return ids
+
+    def _step(self, j, ids):
+        keys = self.keys
+        request = keys[self.request_ids[j]]
+        if self.hit_flags[j]:
+            action, replaced = "HIT", None
+        elif self.evicted_ids[j] == self.NO_KEY:
+            action, replaced = "MISS - Added", None
+        else:
+            replaced = keys[self.evicted_ids[j]]
+            action = f"MISS - Replace {replaced}"
+        return request, action, [keys[i] for i in ids], replaced
+
+    def _iter_range(self, start, stop):
+        if start >= stop:
+            return
+        ids = self._ids_at(start)
+        yield self._step(start, ids)
+        for j in range(start + 1, stop):
+            self._apply(ids, j)
+            yield self._step(j, ids)
+
+    def __iter__(self):
+        return self._iter_range(0, len(self))
+
+    def __getitem__(self, index):
+        n = len(self)
+        if isinstance(index, slice):
+            start, stop, stride = index.indices(n)
+            if stride == 1:
+                return list(self._iter_range(start, stop))
+            return [self[i] for i in range(start, stop, stride)]
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("step index out of range")
+        return self._step(index, self._ids_at(index))
+
+    def hits_through(self, index):
+        """Number of hits in steps 0..index."""
+        if index < 0:
+            index += len(self)
+        c = index // self.checkpoint_every
+        return self._checkpoint_hits[c] + self.hit_flags.count(1, c * self.checkpoint_every, index + 1)
+
+    def window_hit_rate(self, index, window):
+        """Hit rate in percent over the `window` steps ending at step `index`."""
+        if index < 0:
+            index += len(self)
+        start = max(0, index + 1 - window)
+        return self.hit_flags.count(1, start, index + 1) / (index + 1 - start) * 100
+
+    def find_steps(self, hit=None, key=None):
+        """
+        Indices of the steps that hit (hit=True) or missed (hit=False)
+        and/or requested `key`, as an array; None matches anything.
+        """
+        steps = array("l")
+        if key is not None:
+            rid = self._ids.get(key)
+            if rid is None:
+                return steps
+            candidates = (i for i, r in enumerate(self.request_ids) if r == rid)
+        else:
+            candidates = range(len(self))
+        if hit is None:
+            steps.extend(candidates)
+        else:
+            flags, want = self.hit_flags, 1 if hit else 0
+            steps.extend(i for i in candidates if flags[i] == want)
+        return steps
+
+    def next_step(self, key, start=0):
+        """First step at or after `start` that requested or evicted `key`, or -1."""
+        rid = self._ids.get(key)
+        if rid is None:
+            return -1
+        found = []
+        for column in (self.request_ids, self.evicted_ids):
+            try:
+                found.append(column.index(rid, start))
+            except ValueError:
+                pass
+        return min(found, default=-1)
+
+    def key_counts(self):
+        """Per-key (requests, hits) Counters of the whole run."""
+        keys = self.keys
+        requests = Counter(self.request_ids)
+        hits = Counter(compress(self.request_ids, self.hit_flags))
+        return (Counter({keys[i]: n for i, n in requests.items()}),
+                Counter({keys[i]: n for i, n in hits.items()}))
+
+    def cache_at(self, index):
+        """Cache contents (slot order) right after step `index`."""
+        if index < 0:
+            index += len(self)
+        return [self.keys[i] for i in self._ids_at(index)]
+
+
+# ---------------- Cache Algorithms (Fixed) ---------------- #
+# Every engine is a generator of (request, hit, slot, replaced) events, where
+# `slot` is the cache position that served or received the request; the
+# public functions record them in a StepLog.
+def _fifo_events(requests, cache_size):
+    """
+    FIFO engine. `slot` maps each cached key to its position and `q` holds
+    the keys in insertion order, so every step is O(1).
+    """
+    cache, slot, q = [], {}, deque()
+    for r in requests:
+        replaced = None
+        if r in slot:
+            yield r, True, slot[r], None
+            continue
+        if len(cache) < cache_size:
+            slot[r] = len(cache)
+            cache.append(r)
+        else:
+            replaced = q.popleft()
+            idx = slot.pop(replaced)
+            cache[idx] = r
+            slot[r] = idx
+        q.append(r)
+        yield r, False, slot[r], replaced
+
+
+def _lifo_events(requests, cache_size):
+    """LIFO engine, same structures as _fifo_events() with a stack of keys."""
+    cache, slot, stack = [], {}, []
+    for r in requests:
+        replaced = None
+        if r in slot:
+            yield r, True, slot[r], None
+            continue
+        if len(cache) < cache_size:
+            slot[r] = len(cache)
+            cache.append(r)
+        else:
+            replaced = stack.pop()
+            idx = slot.pop(replaced)
+            cache[idx] = r
+            slot[r] = idx
+        stack.append(r)
+        yield r, False, slot[r], replaced
+
+
+def fifo(requests, cache_size):
+    return StepLog.from_events(_fifo_events(requests, cache_size), cache_size)
+
+
+def lifo(requests, cache_size):
+    return StepLog.from_events(_lifo_events(requests, cache_size), cache_size)
+
+
+def next_use_indices(requests):
+    """
+    Return an array whose i-th entry is the index of the next request for
+    requests[i], or len(requests) if it is never requested again.
+    Built with a single backward pass.
+    """
+    n = len(requests)
+    nxt = array("q", bytes(8 * n))
+    last = {}
+    for i in range(n - 1, -1, -1):
+        r = requests[i]
+        nxt[i] = last.get(r, n)
+        last[r] = i
+    return nxt
+
+
+def _optimal_events(requests, cache_size, next_use=None):
+    """
+    Belady's OPTIMAL engine.
+    Next uses come from next_use_indices(), or `next_use` when the caller
+    has already computed them for this trace; the resident keys sit in a
+    max-heap keyed by next use (ties go to the lowest slot, as before).
+    Stale heap entries are skipped lazily and the heap is compacted when it
+    grows past twice the cache size, so each miss costs O(log k).
+    """
+    cache, slot = [], {}
+    nxt = next_use_indices(requests) if next_use is None else next_use
+    upcoming = {}  # key -> index of its next request
+    heap = []  # (-next_use, slot, key)
+    for i, r in enumerate(requests):
+        hit, replaced = r in slot, None
+        if not hit:
+            if len(cache) < cache_size:
+                slot[r] = len(cache)
+                cache.append(r)
+            else:
+                while True:
+                    neg_next, idx, key = heapq.heappop(heap)
+                    if upcoming.get(key) == -neg_next:
+                        break
+                replaced = key
+                del slot[replaced], upcoming[replaced]
+                cache[idx] = r
+                slot[r] = idx
+        upcoming[r] = nxt[i]
+        heapq.heappush(heap, (-nxt[i], slot[r], r))
+        if len(heap) > 2 * cache_size + 16:
+            heap = [(-upcoming[c], j, c) for j, c in enumerate(cache)]
+            heapq.heapify(heap)
+        yield r, hit, slot[r], replaced
+
+
+def optimal(requests, cache_size):
+    return StepLog.from_events(_optimal_events(requests, cache_size), cache_size)
+
+
+def _recency_events(requests, cache_size, evict_recent):
+    """
+    Shared LRU/MRU engine.
+    `slot` maps each cached key to its cache position and `recent` keeps the
+    keys in recency order (oldest first), so hits and evictions are O(1).
+    The victim is the oldest key for LRU and the newest one for MRU.
+    """
+    cache, slot, recent = [], {}, OrderedDict()
+    for r in requests:
+        if r in slot:
+            recent.move_to_end(r)
+            yield r, True, slot[r], None
+            continue
+        replaced = None
+        if len(cache) < cache_size:
+            slot[r] = len(cache)
+            cache.append(r)
+        else:
+            replaced, _ = recent.popitem(last=evict_recent)
+            idx = slot.pop(replaced)
+            cache[idx] = r
+            slot[r] = idx
+        recent[r] = None
+        yield r, False, slot[r], replaced
+
+
+def _lru_events(requests, cache_size):
+    return _recency_events(requests, cache_size, evict_recent=False)
+
+
+def _mru_events(requests, cache_size):
+    return _recency_events(requests, cache_size, evict_recent=True)
+
+
+def lru(requests, cache_size):
+    return StepLog.from_events(_lru_events(requests, cache_size), cache_size)
+
+
+def mru(requests, cache_size):
+    return StepLog.from_events(_mru_events(requests, cache_size), cache_size)
+
+
+# --- تم التعديل هنا: Tree-based Pseudo-LRU ---
+def _pseudo_lru_events(requests, cache_size, variant="tree"):
+    """
+    Pseudo-LRU engine. `slot` maps each cached key to its way.
+
+    variant="tree": a binary tree of bits over the ways, stored in a
+    bytearray in heap order (children of node n are 2n+1 and 2n+2). Each
+    node splits its range of ways in half, so any number of ways works.
+    An access flips the bits on its path to point away from it, and the
+    victim is found by following the bits. Both walks are O(log ways).
+
+    variant="bit": bit-PLRU (MRU bits). Each way has one bit, set on
+    access. When every bit would be set, all other bits are cleared. The
+    victim is the lowest way whose bit is clear. Both are O(1) amortized.
+    """
+    if variant not in ("tree", "bit"):
+        raise ValueError(f"Unknown Pseudo-LRU variant {variant}; choose 'tree' or 'bit'")
+    cache, slot = [], {}
+
+    if variant == "tree":
+        tree_bits = bytearray(2 << max(0, cache_size - 1).bit_length())
+
+        def touch(target_idx):
+            # Point every node on the path away from the accessed way (make it MRU)
+            node, left, right = 0, 0, cache_size
+            while right - left > 1:
+                mid = (left + right) // 2
+                if target_idx < mid:
+                    tree_bits[node] = 1  # protect the left half
+                    node, right = 2 * node + 1, mid
+                else:
+                    tree_bits[node] = 0  # protect the right half
+                    node, left = 2 * node + 2, mid
+
+        def find_victim():
+            # Follow the arrows down to the pseudo-LRU way
+            node, left, right = 0, 0, cache_size
+            while right - left > 1:
+                mid = (left + right) // 2
+                if tree_bits[node] == 0:
+                    node, right = 2 * node + 1, mid
+                else:
+                    node, left = 2 * node + 2, mid
+            return left
+    else:
+        # One byte per way plus a count of set bits. Every way below
+        # `cursor` has its bit set, so the victim scan resumes there.
+        mru_bits = bytearray(cache_size)
+        set_bits = cursor = 0
+
+        def touch(target_idx):
+            nonlocal mru_bits, set_bits, cursor
+            if mru_bits[target_idx]:
+                return
+            set_bits += 1
+            if set_bits == cache_size:
+                # Clearing is O(ways), once per ways - 1 newly set bits
+                mru_bits = bytearray(cache_size)
+                set_bits, cursor = 1, 0
+            mru_bits[target_idx] = 1
+
+        def find_victim():
+            # Lowest clear bit (a single way is always its own MRU)
+            nonlocal cursor
+            if set_bits == cache_size:
+                return 0
+            while mru_bits[cursor]:
+                cursor += 1
+            return cursor
+
+    for r in requests:
+        replaced = None
+        idx = slot.get(r)
+        if idx is not None:
+            touch(idx)
+            yield r, True, idx, None
+            continue
+
+        if len(cache) < cache_size:
+            idx = len(cache)
+            cache.append(r)
+        else:
+            idx = find_victim()
+            replaced = cache[idx]
+            del slot[replaced]
+            cache[idx] = r
+        slot[r] = idx
+        touch(idx)
+        yield r, False, idx, replaced
+
+
+def pseudo_lru(requests, cache_size, variant="tree"):
+    return StepLog.from_events(_pseudo_lru_events(requests, cache_size, variant), cache_size)
+
+
+def _bit_plru_events(requests, cache_size):
+    return _pseudo_lru_events(requests, cache_size, variant="bit")
+
+
+def bit_plru(requests, cache_size):
+    return pseudo_lru(requests, cache_size, variant="bit")
+
+
+def _lfu_events(requests, cache_size, tie="slot", decay_every=None, keep_history=True):
+    """
+    Least Frequently Used engine.
+    Resident keys are grouped into buckets by access count and the lowest
+    non-empty count comes from a lazily cleaned heap, so the victim is found
+    without scanning the cache.
+
+    tie          -- how keys sharing the lowest count are ordered:
+                    "slot" lowest cache slot (original behaviour),
+                    "fifo" first key to enter the cache,
+                    "lru"  least recently used key (O(1) per bucket).
+    decay_every  -- halve every count each N requests and forget evicted
+                    keys whose count reaches zero (aging).
+    keep_history -- keep the counts of evicted keys so they resume them when
+                    they come back (original behaviour).
+    """
+    if tie not in ("slot", "fifo", "lru"):
+        raise ValueError(f"Unknown LFU tie-breaking rule: {tie}")
+
+    cache, slot, freq = [], {}, {}
+    rank = {}  # resident key -> tie-breaking rank, lowest is evicted first
+    buckets = {}  # count -> OrderedDict(key -> rank), entry order
+    order = {}  # count -> heap of (rank, key), used unless tie == "lru"
+    levels = []  # heap of counts that (may) have a bucket
+
+    def enter(key, count):
+        bucket = buckets.get(count)
+        if bucket is None:
+            bucket = buckets[count] = OrderedDict()
+            order[count] = []
+            heapq.heappush(levels, count)
+            if len(levels) > 2 * len(buckets) + 16:
+                levels[:] = sorted(buckets)
+        bucket[key] = rank[key]
+        if tie != "lru":
+            heap = order[count]
+            heapq.heappush(heap, (rank[key], key))
+            if len(heap) > 2 * len(bucket) + 16:
+                heap[:] = sorted((rk, k) for k, rk in bucket.items())
+
+    def leave(key, count):
+        bucket = buckets[count]
+        del bucket[key]
+        if not bucket:
+            del buckets[count], order[count]
+
+    def pop_victim():
+        while levels[0] not in buckets:
+            heapq.heappop(levels)
+        count = levels[0]
+        bucket = buckets[count]
+        if tie == "lru":
+            key = next(iter(bucket))
+        else:
+            heap = order[count]
+            while True:
+                rk, key = heapq.heappop(heap)
+                if bucket.get(key) == rk:
+                    break
+        leave(key, count)
+        return key
+
+    def decay():
+        for key in list(freq):
+            count = freq[key] >> 1
+            if key in slot:
+                freq[key] = max(count, 1)
+            elif count:
+                freq[key] = count
+            else:
+                del freq[key]
+        buckets.clear()
+        order.clear()
+        levels.clear()
+        for key in sorted(slot, key=rank.__getitem__):
+            enter(key, freq[key])
+
+    for i, r in enumerate(requests):
+        hit, replaced = r in slot, None
+        if hit:
+            leave(r, freq[r])
+        else:
+            if len(cache) < cache_size:
+                slot[r] = len(cache)
+                cache.append(r)
+            else:
+                replaced = pop_victim()
+                idx = slot.pop(replaced)
+                del rank[replaced]
+                if not keep_history:
+                    del freq[replaced]
+                cache[idx] = r
+                slot[r] = idx
+            freq[r] = freq.get(r, 0)
+            if tie == "fifo":
+                rank[r] = i
+        freq[r] += 1
+        if tie == "slot":
+            rank[r] = slot[r]
+        elif tie == "lru":
+            rank[r] = i
+        enter(r, freq[r])
+        if decay_every and (i + 1) % decay_every == 0:
+            decay()
+        yield r, hit, slot[r], replaced
+
+
+def lfu(requests, cache_size, tie="slot", decay_every=None, keep_history=True):
+    """Least Frequently Used; see _lfu_events() for the options."""
+    return StepLog.from_events(
+        _lfu_events(requests, cache_size, tie, decay_every, keep_history), cache_size)
+
+
+# ---------------- FIFO-Family Policies ---------------- #
+# Hits only set a bit or bump a counter; nothing is reordered, which is what
+# makes these policies cheap to run behind a concurrent cache.
+def _clock_events(requests, cache_size, bits=1):
+    """
+    CLOCK engine with `bits`-bit reference counters (bits=1 is classic
+    second chance, more bits give GCLOCK-style frequency). A hit
+    increments the key's counter up to 2**bits - 1. The hand sweeps the
+    slots, decrementing counters, and evicts the first key whose counter
+    is zero. Every counter step is paid for by an earlier hit, so the
+    sweep is O(1) amortized.
+    """
+    if bits < 1:
+        raise ValueError("CLOCK needs at least one reference bit")
+    top = (1 << bits) - 1
+    cache, slot, counts = [], {}, []
+    hand = 0
+    for r in requests:
+        idx = slot.get(r)
+        if idx is not None:
+            if counts[idx] < top:
+                counts[idx] += 1
+            yield r, True, idx, None
+            continue
+        replaced = None
+        if len(cache) < cache_size:
+            idx = len(cache)
+            cache.append(r)
+            counts.append(0)
+        else:
+            while counts[hand]:
+                counts[hand] -= 1
+                hand = (hand + 1) % cache_size
+            idx = hand
+            replaced = cache[idx]
+            del slot[replaced]
+            cache[idx] = r
+            counts[idx] = 0
+            hand = (hand + 1) % cache_size
+        slot[r] = idx
+        yield r, False, idx, replaced
+
+
+def clock(requests, cache_size, bits=1):
+    return StepLog.from_events(_clock_events(requests, cache_size, bits), cache_size)
+
+
+def _sieve_events(requests, cache_size):
+    """
+    SIEVE engine (Zhang et al., NSDI '24). Keys form a FIFO list,
+    newest at the head. A hit only marks the key visited. The hand walks
+    from the tail toward the head, clearing visited marks, and evicts the
+    first unmarked key; it then stays where it stopped, so new keys are
+    not examined until the hand wraps around. The list is kept as
+    `newer`/`older` dicts, so removal from the middle is O(1).
+    """
+    cache, slot, visited = [], {}, {}
+    newer, older = {}, {}
+    head = tail = hand = None
+    for r in requests:
+        if r in slot:
+            visited[r] = True
+            yield r, True, slot[r], None
+            continue
+        replaced = None
+        if len(cache) < cache_size:
+            slot[r] = len(cache)
+            cache.append(r)
+        else:
+            victim = tail if hand is None else hand
+            while visited[victim]:
+                visited[victim] = False
+                victim = newer[victim]
+                if victim is None:
+                    victim = tail
+            hand = newer[victim]
+            # Unlink the victim
+            before, after = older.pop(victim), newer.pop(victim)
+            if before is None:
+                tail = after
+            else:
+                newer[before] = after
+            if after is None:
+                head = before
+            else:
+                older[after] = before
+            del visited[victim]
+            replaced = victim
+            idx = slot.pop(victim)
+            cache[idx] = r
+            slot[r] = idx
+        # Link the new key at the head
+        visited[r] = False
+        older[r], newer[r] = head, None
+        if head is None:
+            tail = r
+        else:
+            newer[head] = r
+        head = r
+        yield r, False, slot[r], replaced
+
+
+def sieve(requests, cache_size):
+    return StepLog.from_events(_sieve_events(requests, cache_size), cache_size)
+
+
+def _s3fifo_events(requests, cache_size, small_ratio=0.1, ghost_ratio=1.0, move_threshold=1):
+    """
+    S3-FIFO engine (Yang et al., SOSP '23). New keys enter a small FIFO S
+    (small_ratio of the cache). Keys hit at least `move_threshold` times
+    while in S move on to the main FIFO M; the others are evicted and
+    remembered in the ghost FIFO G, which holds ghost_ratio x |M| keys. A
+    key found in G goes straight to M. M is a CLOCK with 2-bit counters:
+    its tail is reinserted while its counter is non-zero. Hits only bump
+    the counter, up to 3. Each miss on a full cache evicts exactly one key,
+    so the replaced slot always goes to the new key.
+    """
+    small_size = max(1, int(cache_size * small_ratio))
+    main_size = max(0, cache_size - small_size)
+    ghost_size = int(ghost_ratio * max(main_size, 1))
+
+    cache, slot, freq = [], {}, {}
+    small, main, ghost = deque(), deque(), OrderedDict()  # tail on the left
+
+    def evict_main():
+        while True:
+            key = main.popleft()
+            if freq[key]:
+                freq[key] -= 1
+                main.append(key)
+            else:
+                return key
+
+    def evict_small():
+        while small:
+            key = small.popleft()
+            if freq[key] >= move_threshold:
+                freq[key] = 0
+                main.append(key)
+                if len(main) > main_size:
+                    return evict_main()
+            else:
+                if ghost_size:
+                    ghost[key] = None
+                    if len(ghost) > ghost_size:
+                        ghost.popitem(last=False)
+                return key
+        return evict_main()
+
+    for r in requests:
+        if r in slot:
+            if freq[r] < 3:
+                freq[r] += 1
+            yield r, True, slot[r], None
+            continue
+        replaced = None
+        if len(cache) < cache_size:
+            slot[r] = len(cache)
+            cache.append(r)
+        else:
+            replaced = evict_small() if len(small) >= small_size or not main else evict_main()
+            del freq[replaced]
+            idx = slot.pop(replaced)
+            cache[idx] = r
+            slot[r] = idx
+        freq[r] = 0
+        if r in ghost:
+            del ghost[r]
+            main.append(r)
+        else:
+            small.append(r)
+        yield r, False, slot[r], replaced
+
+
+def s3fifo(requests, cache_size, small_ratio=0.1, ghost_ratio=1.0, move_threshold=1):
+    return StepLog.from_events(
+        _s3fifo_events(requests, cache_size, small_ratio, ghost_ratio, move_threshold), cache_size)
+
+
+# ---------------- Scan-Resistant Policies ---------------- #
+def _arc_events(requests, cache_size):
+    """
+    Adaptive Replacement Cache (Megiddo & Modha).
+    Resident keys are split into T1 (seen once recently) and T2 (seen at
+    least twice), each an OrderedDict in LRU order. The ghost lists B1/B2
+    remember keys recently evicted from each. A ghost hit moves the target
+    size `p` of T1 toward the list that would have hit. Together, the four
+    lists never hold more than 2 * cache_size keys. Every step is O(1).
+    """
+    cache, slot = [], {}
+    t1, t2, b1, b2 = OrderedDict(), OrderedDict(), OrderedDict(), OrderedDict()
+    p = 0
+
+    def replace(in_b2):
+        # Evict from T1 if it is over its target size, from T2 otherwise
+        if t1 and ((in_b2 and len(t1) == p) or len(t1) > p):
+            victim, _ = t1.popitem(last=False)
+            b1[victim] = None
+        else:
+            victim, _ = t2.popitem(last=False)
+            b2[victim] = None
+        return victim
+
+    for r in requests:
+        if r in t1:
+            del t1[r]
+            t2[r] = None
+            yield r, True, slot[r], None
+            continue
+        if r in t2:
+            t2.move_to_end(r)
+            yield r, True, slot[r], None
+            continue
+
+        replaced = None
+        if r in b1:
+            p = min(cache_size, p + max(len(b2) // len(b1), 1))
+            replaced = replace(False)
+            del b1[r]
+            t2[r] = None
+        elif r in b2:
+            p = max(0, p - max(len(b1) // len(b2), 1))
+            replaced = replace(True)
+            del b2[r]
+            t2[r] = None
+        else:
+            if len(t1) + len(b1) == cache_size:
+                if len(t1) < cache_size:
+                    b1.popitem(last=False)
+                    replaced = replace(False)
+                else:
+                    replaced, _ = t1.popitem(last=False)
+            elif len(t1) + len(t2) + len(b1) + len(b2) >= cache_size:
+                if len(t1) + len(t2) + len(b1) + len(b2) == 2 * cache_size:
+                    b2.popitem(last=False)
+                replaced = replace(False)
+            t1[r] = None
+
+        if replaced is None:
+            slot[r] = len(cache)
+            cache.append(r)
+        else:
+            idx = slot.pop(replaced)
+            cache[idx] = r
+            slot[r] = idx
+        yield r, False, slot[r], replaced
+
+
+def arc(requests, cache_size):
+    return StepLog.from_events(_arc_events(requests, cache_size), cache_size)
+
+
+def _lirs_events(requests, cache_size, hir_ratio=0.01, max_ghosts=None):
+    """
+    Low Inter-reference Recency Set (Jiang & Zhang).
+    Most of the cache holds LIR keys, whose reuse distance is short. The
+    remaining max(1, hir_ratio * cache_size) slots hold resident HIR keys in
+    the FIFO queue Q, and these are the only eviction candidates. The
+    recency stack S (OrderedDict, bottom first) also holds non-resident HIR
+    keys. An HIR key that is hit while still in S has a shorter reuse
+    distance than the oldest LIR key, and the two swap status. S is pruned
+    so that its bottom is always an LIR key. At most `max_ghosts`
+    (default: cache_size) non-resident keys are remembered. Steps are O(1)
+    amortized.
+    """
+    hir_slots = max(1, int(cache_size * hir_ratio))
+    lir_slots = max(0, cache_size - hir_slots)
+    if max_ghosts is None:
+        max_ghosts = cache_size
+
+    cache, slot = [], {}
+    stack, queue, ghosts = OrderedDict(), OrderedDict(), OrderedDict()
+    lir = set()
+
+    def prune():
+        # Drop HIR entries from the bottom of S until an LIR key is there
+        while stack:
+            bottom = next(iter(stack))
+            if bottom in lir:
+                break
+            del stack[bottom]
+            ghosts.pop(bottom, None)
+
+    def demote():
+        # The bottom LIR key becomes a resident HIR key
+        prune()
+        bottom, _ = stack.popitem(last=False)
+        lir.discard(bottom)
+        queue[bottom] = None
+        prune()
+
+    for r in requests:
+        if r in lir:
+            stack.move_to_end(r)
+            prune()
+            yield r, True, slot[r], None
+            continue
+        if r in slot:  # resident HIR
+            if r in stack:
+                stack.move_to_end(r)
+                del queue[r]
+                lir.add(r)
+                demote()
+            else:
+                stack[r] = None
+                queue.move_to_end(r)
+            yield r, True, slot[r], None
+            continue
+
+        replaced = None
+        if len(cache) < cache_size:
+            slot[r] = len(cache)
+            cache.append(r)
+        else:
+            replaced, _ = queue.popitem(last=False)
+            idx = slot.pop(replaced)
+            cache[idx] = r
+            slot[r] = idx
+            if replaced in stack:
+                ghosts[replaced] = None
+                if len(ghosts) > max_ghosts:
+                    oldest, _ = ghosts.popitem(last=False)
+                    del stack[oldest]
+
+        if len(lir) < lir_slots:
+            # Warm-up: the first distinct keys fill the LIR set
+            lir.add(r)
+            stack[r] = None
+        elif r in stack:
+            # Non-resident HIR key seen again within S: promote it
+            del ghosts[r]
+            stack.move_to_end(r)
+            lir.add(r)
+            if len(lir) > lir_slots:
+                demote()
+        else:
+            stack[r] = None
+            queue[r] = None
+        yield r, False, slot[r], replaced
+
+
+def lirs(requests, cache_size, hir_ratio=0.01, max_ghosts=None):
+    return StepLog.from_events(_lirs_events(requests, cache_size, hir_ratio, max_ghosts), cache_size)
+
+
+# ---------------- Admission Filter (W-TinyLFU) ---------------- #
+_HALVE = bytes(v >> 1 for v in range(256))
+_SKETCH_SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9,
+                 0xD6E8FEB86659FD93, 0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53)
+
+
+def stable_key_hash(key):
+    """
+    64-bit hash of a trace key that, unlike hash() on str and bytes, is not
+    salted per process. Integers hash as with hash(); other keys by two
+    CRC-32s of their text.
+    """
+    if isinstance(key, int):
+        return hash(key) & 0xFFFFFFFFFFFFFFFF
+    data = str(key).encode()
+    return zlib.crc32(data) << 32 | zlib.crc32(data, 0x9E3779B9)
+
+
+class CountMinSketch:
+    """
+    Approximate access counts in a fixed amount of memory: `depth` rows
+    of `width` 4-bit saturating counters (one byte each), read as the
+    minimum over the rows. After `sample_size` increments every counter is
+    halved, so old popularity fades.
+
+    With doorkeeper=True, a Bloom filter absorbs the first access of every
+    key, so one-hit wonders never reach the counters. It is cleared on
+    every halving.
+
+    Keys are hashed with stable_key_hash(), so counts (and W-TinyLFU's
+    decisions) are the same in every run and worker process.
+    """
+
+    MAX_COUNT = 15
+
+    def __init__(self, width, depth=4, sample_size=None, doorkeeper=True):
+        if not 1 <= depth <= len(_SKETCH_SEEDS):
+            raise ValueError(f"sketch depth must be between 1 and {len(_SKETCH_SEEDS)}")
+        self.width = 1 << max(4, (width - 1).bit_length())
+        self.depth = depth
+        self.sample_size = sample_size or 10 * width
+        self._shift = 64 - (self.width.bit_length() - 1)
+        self._door_shift = self._shift - 3  # 8 * width doorkeeper bits
+        self._rows = [(row * self.width, seed) for row, seed in enumerate(_SKETCH_SEEDS[:depth])]
+        self.counters = bytearray(self.width * depth)
+        self.doorkeeper = bytearray(self.width) if doorkeeper else None  # 8 * width bits
+        self.additions = 0
+
+    def _locate(self, key):
+        """Counter indexes of `key` (one per row) and its two doorkeeper bits."""
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF if type(key) is int else stable_key_hash(key)
+        h ^= h >> 29
+        shift = self._shift
+        indexes = [offset + ((h * seed & 0xFFFFFFFFFFFFFFFF) >> shift) for offset, seed in self._rows]
+        return indexes, (h * 0xA24BAED4963EE407 & 0xFFFFFFFFFFFFFFFF) >> self._door_shift, \
+            (h * 0x9FB21C651E98DF25 & 0xFFFFFFFFFFFFFFFF) >> self._door_shift
+
+    def increment(self, key):
+        indexes, a, b = self._locate(key)
+        door = self.doorkeeper
+        if door is not None and not (door[a >> 3] >> (a & 7) & 1 and door[b >> 3] >> (b & 7) & 1):
+            # First sighting since the last halving: only remember it in the doorkeeper
+            door[a >> 3] |= 1 << (a & 7)
+            door[b >> 3] |= 1 << (b & 7)
+        else:
+            counters = self.counters
+            for i in indexes:
+                if counters[i] < self.MAX_COUNT:
+                    counters[i] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.counters = self.counters.translate(_HALVE)
+            if door is not None:
+                self.doorkeeper = bytearray(self.width)
+            self.additions //= 2
+
+    def estimate(self, key):
+        indexes, a, b = self._locate(key)
+        count = min(map(self.counters.__getitem__, indexes))
+        door = self.doorkeeper
+        if door is not None and door[a >> 3] >> (a & 7) & 1 and door[b >> 3] >> (b & 7) & 1:
+            count += 1
+        return count
+
+
+def _wtinylfu_events(requests, cache_size, window_ratio=0.01, protected_ratio=0.8,
+                     sketch_width=None, sketch_depth=4, doorkeeper=True, keys=None):
+    """
+    W-TinyLFU engine (Einziger et al.). New keys enter a small window LRU
+    (window_ratio of the cache). The window's LRU key then competes for a
+    place in the main segmented LRU (probation + protected, protected_ratio
+    of main) against main's victim. The key with the higher CountMinSketch
+    estimate stays. Keys hit in probation are promoted to protected. Memory
+    is bounded by the cache plus a fixed-size sketch (by default one counter
+    per slot and row), unlike the exact counts of lfu().
+
+    The sketch hashes keys, so its collisions depend on them. When
+    `requests` are interned ids (see simulate_many()), pass the id -> key
+    list as `keys` and the sketch counts the original keys instead, giving
+    the same results as a run over the keys themselves.
+    """
+    window_size = min(cache_size, max(1, int(cache_size * window_ratio)))
+    main_size = cache_size - window_size
+    protected_size = int(main_size * protected_ratio)
+    sketch = CountMinSketch(sketch_width or cache_size, sketch_depth,
+                            doorkeeper=doorkeeper)
+    if keys is None:
+        increment, estimate = sketch.increment, sketch.estimate
+    else:
+        def increment(r):
+            sketch.increment(keys[r])
+
+        def estimate(r):
+            return sketch.estimate(keys[r])
+
+    cache, slot = [], {}
+    window, probation, protected = OrderedDict(), OrderedDict(), OrderedDict()  # LRU first
+
+    for r in requests:
+        increment(r)
+        if r in slot:
+            if r in window:
+                window.move_to_end(r)
+            elif r in probation:
+                del probation[r]
+                protected[r] = None
+                if len(protected) > protected_size:
+                    demoted, _ = protected.popitem(last=False)
+                    probation[demoted] = None
+            else:
+                protected.move_to_end(r)
+            yield r, True, slot[r], None
+            continue
+
+        replaced = None
+        window[r] = None
+        if len(window) > window_size:
+            candidate, _ = window.popitem(last=False)
+            if len(cache) < cache_size:
+                probation[candidate] = None
+            else:
+                main = probation or protected
+                if main and estimate(candidate) > estimate(next(iter(main))):
+                    replaced, _ = main.popitem(last=False)
+                    probation[candidate] = None
+                else:
+                    replaced = candidate
+
+        if replaced is None:
+            slot[r] = len(cache)
+            cache.append(r)
+        else:
+            idx = slot.pop(replaced)
+            cache[idx] = r
+            slot[r] = idx
+        yield r, False, slot[r], replaced
+
+
+def wtinylfu(requests, cache_size, window_ratio=0.01, protected_ratio=0.8,
+             sketch_width=None, sketch_depth=4, doorkeeper=True):
+    return StepLog.from_events(
+        _wtinylfu_events(requests, cache_size, window_ratio, protected_ratio,
+                         sketch_width, sketch_depth, doorkeeper), cache_size)
+
+
+# ---------------- Policy Registry ---------------- #
+# Event engines by display name; every entry accepts (requests, cache_size).
+ENGINES = {
+    "FIFO": _fifo_events,
+    "LIFO": _lifo_events,
+    "OPTIMAL": _optimal_events,
+    "LRU": _lru_events,
+    "MRU": _mru_events,
+    "Pseudo-LRU": _pseudo_lru_events,
+    "Bit-PLRU": _bit_plru_events,
+    "LFU": _lfu_events,
+    "ARC": _arc_events,
+    "LIRS": _lirs_events,
+    "CLOCK": _clock_events,
+    "SIEVE": _sieve_events,
+    "S3-FIFO": _s3fifo_events,
+    "W-TinyLFU": _wtinylfu_events,
+}
+
+# Step-log producing functions, as used by the GUI.
+POLICIES = {
+    "FIFO": fifo, "LIFO": lifo, "OPTIMAL": optimal,
+    "LRU": lru, "MRU": mru, "Pseudo-LRU": pseudo_lru, "Bit-PLRU": bit_plru, "LFU": lfu,
+    "ARC": arc, "LIRS": lirs, "CLOCK": clock, "SIEVE": sieve, "S3-FIFO": s3fifo,
+    "W-TinyLFU": wtinylfu,
+}
+
+
+def check_policies(policies):
+    """Raise ValueError naming every entry of `policies` that is not a registered policy."""
+    unknown = [p for p in policies if p not in ENGINES]
+    if unknown:
+        raise ValueError(f"Unknown policy {', '.join(unknown)}; choose from {', '.join(ENGINES)}")
+
+
+# ---------------- Streaming Simulation ---------------- #
+class RunningMetrics:
+    """
+    Hit/miss counters kept up to date while a simulation runs. Every
+    read is O(1). With per_key=True it also counts requests and hits per
+    key; with a `window` it keeps the hit rate of the last `window`
+    requests.
+    """
+
+    def __init__(self, window=None, per_key=False):
+        self.requests = 0
+        self.hits = 0
+        self.window = window
+        self.window_hits = 0
+        self._recent = deque() if window else None
+        self.key_requests = Counter() if per_key else None
+        self.key_hits = Counter() if per_key else None
+
+    def update(self, hit, key=None):
+        self.requests += 1
+        if hit:
+            self.hits += 1
+        if self._recent is not None:
+            self._recent.append(hit)
+            if hit:
+                self.window_hits += 1
+            if len(self._recent) > self.window and self._recent.popleft():
+                self.window_hits -= 1
+        if self.key_requests is not None:
+            self.key_requests[key] += 1
+            if hit:
+                self.key_hits[key] += 1
+
+    @property
+    def misses(self):
+        return self.requests - self.hits
+
+    @property
+    def hit_rate(self):
+        """Hit rate in percent."""
+        return (self.hits / self.requests * 100) if self.requests else 0
+
+    @property
+    def window_hit_rate(self):
+        """Hit rate of the last `window` requests, in percent."""
+        if not self._recent:
+            return 0
+        return self.window_hits / len(self._recent) * 100
+
+    def key_hit_rate(self, key):
+        """Hit rate of one key in percent (needs per_key=True)."""
+        n = self.key_requests[key]
+        return (self.key_hits[key] / n * 100) if n else 0
+
+    def __repr__(self):
+        return (f"RunningMetrics(requests={self.requests}, hits={self.hits}, "
+                f"hit_rate={self.hit_rate:.2f}%)")
+
+
+# Online policies: they only look at the current request, so they can run
+# over any iterator of keys. OPTIMAL needs the future and is not listed.
+STREAMING_ENGINES = {name: engine for name, engine in ENGINES.items() if name != "OPTIMAL"}
+
+
+def stream(policy, keys, cache_size, metrics=None, observers=None, **options):
+    """
+    Simulate an online policy over any iterable of keys (file readers,
+    generators, ...), yielding (request, hit, slot, replaced) events lazily.
+    Pass a RunningMetrics as `metrics` to read running counters while
+    consuming, and CacheObservers as `observers` to receive cache events.
+    Memory is O(cache_size); for LFU that needs
+    keep_history=False or decay_every, since it otherwise remembers the
+    count of every key ever seen. Extra options go to the engine.
+    """
+    try:
+        engine = STREAMING_ENGINES[policy]
+    except KeyError:
+        raise ValueError(f"{policy} is not a streaming policy; "
+                         f"choose from {', '.join(STREAMING_ENGINES)}") from None
+    events = engine(iter(keys), cache_size, **options)
+    if observers:
+        events = observe(events, observers)
+    if metrics is None:
+        yield from events
+        return
+    update = metrics.update
+    for event in events:
+        update(event[1], event[0])
+        yield event
+
+
+def simulate(policy, requests, cache_size, observers=None, **options):
+    """
+    Run any registered policy over `requests` without a step log; return
+    its RunningMetrics. `observers` (CacheObservers) receive cache events.
+    """
+    check_policies([policy])
+    engine = ENGINES[policy]
+    metrics = RunningMetrics()
+    update = metrics.update
+    events = engine(requests, cache_size, **options)
+    if observers:
+        events = observe(events, observers)
+    for event in events:
+        update(event[1])
+    return metrics
+
+
+class SimulationCancelled(Exception):
+    """Raised when a long-running computation is cancelled through its `cancel` callback."""
+
+
+def run_policy(policy, requests, cache_size, progress=None, cancel=None, every=4096,
+               observers=None, **options):
+    """
+    Run any registered policy into a StepLog, like POLICIES[policy], for use
+    from a background thread: every `every` requests it calls
+    progress(done, total) and raises SimulationCancelled once cancel()
+    returns True. `observers` (CacheObservers) receive cache events.
+    """
+    check_policies([policy])
+    engine = ENGINES[policy]
+    total = len(requests)
+    log = StepLog(cache_size)
+    append = log.append
+    events = engine(requests, cache_size, **options)
+    if observers:
+        events = observe(events, observers)
+    for done, (r, hit, slot, replaced) in enumerate(events, 1):
+        append(r, hit, slot, replaced)
+        if done % every == 0:
+            if cancel is not None and cancel():
+                raise SimulationCancelled(policy)
+            if progress is not None:
+                progress(done, total)
+    return log
+
+
+def simulate_stream(policy, keys, cache_size, observers=None, **options):
+    """Run `policy` over `keys` without keeping any steps; return the RunningMetrics."""
+    metrics = RunningMetrics()
+    for _ in stream(policy, keys, cache_size, metrics, observers, **options):
+        pass
+    return metrics
+
+
+# ---------------- Fused Simulation ---------------- #
+def intern_keys(requests):
+    """
+    Dense integer ids for a trace: (array of ids, id -> key list,
+    key -> id dict). Engines hash small ints faster than arbitrary keys.
+    """
+    ids, keys, index = array("q"), [], {}
+    append = ids.append
+    for r in requests:
+        rid = index.get(r)
+        if rid is None:
+            rid = index[r] = len(keys)
+            keys.append(r)
+        append(rid)
+    return ids, keys, index
+
+
+def simulate_many(policies, requests, cache_size, logs=False, progress=None, cancel=None,
+                  every=16384, options=None):
+    """
+    Run several policies over one trace in a single pass and return a dict
+    of policy -> RunningMetrics, or -> StepLog with logs=True.
+
+    The trace is read once to intern its keys, and OPTIMAL's next uses are
+    computed once from the ids; W-TinyLFU's sketch is handed the id -> key
+    table so it hashes the original keys, and every policy gives the same
+    results as simulate(). The engines then advance together over
+    the id array, `every` requests at a time: each block stays in cache
+    while every engine consumes it. Interleaving engines on every request
+    is slower in CPython, since each switch evicts the previous engine's
+    state. Step logs share one key table; without them only hit counters
+    are kept. progress(done, total) and cancel() are checked between
+    blocks, as in run_policy(). `options` is an optional dict of policy
+    name -> engine keyword arguments.
+    """
+    check_policies(policies)
+    policies = list(dict.fromkeys(policies))
+    options = options or {}
+    ids, keys, index = intern_keys(requests)
+    total = len(ids)
+    shared = {"W-TinyLFU": {"keys": keys}}
+    if "OPTIMAL" in policies:
+        shared["OPTIMAL"] = {"next_use": next_use_indices(ids)}
+    engines = [ENGINES[p](ids, cache_size, **options.get(p, {}), **shared.get(p, {}))
+               for p in policies]
+
+    if logs:
+        recorders = [StepLog(cache_size, keys=keys, key_ids=index) for _ in policies]
+    else:
+        hits = [0] * len(policies)
+    no_key = StepLog.NO_KEY
+    for done in range(0, total, every):
+        block = min(every, total - done)
+        for j, engine in enumerate(engines):
+            if logs:
+                append = recorders[j].append_id
+                for r, hit, slot, replaced in islice(engine, block):
+                    append(r, hit, slot, no_key if replaced is None else replaced)
+            else:
+                hits[j] += sum(map(itemgetter(1), islice(engine, block)))
+        if cancel is not None and cancel():
+            raise SimulationCancelled(", ".join(policies))
+        if progress is not None:
+            progress(done + block, total)
+
+    if logs:
+        return dict(zip(policies, recorders))
+    results = {}
+    for policy, count in zip(policies, hits):
+        metrics = results[policy] = RunningMetrics()
+        metrics.requests, metrics.hits = total, count
+    return results
+
+
+# ---------------- Miss Ratio Curves ---------------- #
+class _Fenwick:
+    """Binary indexed tree over positions 0..n-1 holding small integer counts."""
+
+    def __init__(self, n):
+        self.tree = array("q", bytes(8 * (n + 1)))
+
+    def add(self, pos, delta):
+        tree = self.tree
+        n = len(tree)
+        pos += 1
+        while pos < n:
+            tree[pos] += delta
+            pos += pos & -pos
+
+    def prefix(self, pos):
+        """Sum of positions 0..pos-1."""
+        tree, total = self.tree, 0
+        while pos > 0:
+            total += tree[pos]
+            pos -= pos & -pos
+        return total
+
+
+class _StackDistances:
+    """
+    LRU stack distances over a stream, with key removal. A Fenwick tree
+    marks the last access time of every live key; times are renumbered
+    whenever the clock reaches the tree size, so memory stays proportional
+    to the number of live keys rather than to the trace length.
+    """
+
+    def __init__(self):
+        self.last = {}
+        self._reset(1024)
+
+    def _reset(self, size):
+        self.marks = _Fenwick(size)
+        self.size = size
+        self.clock = 0
+
+    def _compact(self):
+        live = sorted(self.last, key=self.last.get)
+        self._reset(max(4096, 4 * len(live)))
+        for t, key in enumerate(live):
+            self.last[key] = t
+            self.marks.add(t, 1)
+        self.clock = len(live)
+
+    def access(self, key):
+        """Stack distance of `key` (0 for a first reference), then make it most recent."""
+        if self.clock == self.size:
+            self._compact()
+        last, marks = self.last, self.marks
+        p = last.get(key)
+        if p is None:
+            distance = 0
+        else:
+            distance = len(last) - marks.prefix(p + 1) + 1
+            marks.add(p, -1)
+        marks.add(self.clock, 1)
+        last[key] = self.clock
+        self.clock += 1
+        return distance
+
+    def rank(self, key):
+        """Recency rank of a live key: 1 for the most recent, len(last) for the least."""
+        return len(self.last) - self.marks.prefix(self.last[key] + 1) + 1
+
+    def remove(self, key):
+        p = self.last.pop(key, None)
+        if p is not None:
+            self.marks.add(p, -1)
+
+
+def lru_stack_distances(requests):
+    """
+    Yield the LRU stack distance of every request (Mattson et al.): 1 for a
+    re-reference to the most recent key, d when d-1 distinct keys were
+    touched since its last use, and 0 for a first reference.
+
+    A Fenwick tree marks the last access time of every key, so the number of
+    distinct keys between two uses is a range count: O(n log n) overall.
+    """
+    marks = _Fenwick(len(requests))
+    last = {}
+    for i, r in enumerate(requests):
+        p = last.get(r)
+        if p is None:
+            yield 0
+        else:
+            yield marks.prefix(i) - marks.prefix(p + 1) + 1
+            marks.add(p, -1)
+        marks.add(i, 1)
+        last[r] = i
+
+
+def _curve_from_histogram(hist, total, max_size):
+    curve, hits = [], 0
+    for size in range(1, max_size + 1):
+        hits += hist[size]
+        curve.append((total - hits) / total if total else 0.0)
+    return curve
+
+
+def lru_miss_ratio_curve(requests, max_size=None, cancel=None):
+    """
+    LRU miss ratio for every cache size 1..max_size in one pass.
+    Returns a list where curve[c - 1] is the miss ratio of a c-slot cache;
+    max_size defaults to the number of distinct keys (the curve is flat after).
+    """
+    if max_size is None:
+        max_size = max(1, len(set(requests)))
+    hist = [0] * (max_size + 1)
+    for i, d in enumerate(lru_stack_distances(requests)):
+        if 0 < d <= max_size:
+            hist[d] += 1
+        if cancel is not None and i % 4096 == 0 and cancel():
+            raise SimulationCancelled("LRU miss ratio curve")
+    return _curve_from_histogram(hist, len(requests), max_size)
+
+
+def optimal_miss_ratio_curve(requests, max_size, cancel=None):
+    """
+    OPTIMAL miss ratio for every cache size 1..max_size in one pass.
+    Belady's policy is a stack algorithm with "sooner next use" as priority,
+    so Mattson's priority-stack update gives all sizes at once. Each request
+    walks the stack down to its old depth, so the cost is O(n * max_size).
+    """
+    nxt = next_use_indices(requests)
+    upcoming = {}
+    stack = []  # stack[j] is in every cache larger than j slots
+    hist = [0] * (max_size + 1)
+    for i, r in enumerate(requests):
+        if cancel is not None and i % 4096 == 0 and cancel():
+            raise SimulationCancelled("OPTIMAL miss ratio curve")
+        try:
+            depth = stack.index(r)
+        except ValueError:
+            depth = len(stack)
+        else:
+            hist[depth + 1] += 1
+        if depth:
+            carry, stack[0] = stack[0], r
+            for j in range(1, depth):
+                if upcoming[stack[j]] > upcoming[carry]:
+                    stack[j], carry = carry, stack[j]
+            if depth < len(stack):
+                stack[depth] = carry
+            elif len(stack) < max_size:
+                stack.append(carry)
+        elif not stack:
+            stack.append(r)
+        upcoming[r] = nxt[i]
+    return _curve_from_histogram(hist, len(requests), max_size)
+
+
+# ---------------- Observers ---------------- #
+class CacheObserver:
+    """
+    Base class for simulation observers; override any of the callbacks.
+    `step` is the index of the request that caused the event.
+
+    on_hit(step, key, slot)
+    on_miss(step, key)
+    on_insert(step, key, slot)
+    on_evict(step, key, slot, age, frequency, rank)
+        age       -- steps since the victim was inserted
+        frequency -- requests for the victim while it was cached
+        rank      -- its recency rank among cached keys (1 = most recent),
+                     or None unless an observer sets track_recency
+    on_end(steps)  -- the run is over after `steps` requests
+    """
+
+    # Recency ranks cost O(log k) per request, so they are opt-in
+    track_recency = False
+
+    def on_hit(self, step, key, slot):
+        pass
+
+    def on_miss(self, step, key):
+        pass
+
+    def on_insert(self, step, key, slot):
+        pass
+
+    def on_evict(self, step, key, slot, age, frequency, rank):
+        pass
+
+    def on_end(self, steps):
+        pass
+
+
+def _callbacks(observers, name):
+    """Bound `name` callbacks of the observers that override it."""
+    default = getattr(CacheObserver, name)
+    return [getattr(o, name) for o in observers
+            if getattr(type(o), name, default) is not default]
+
+
+def observe(events, observers):
+    """
+    Pass (request, hit, slot, replaced) events through unchanged while
+    reporting them to `observers`. Works with any engine: ages, frequencies
+    and recency ranks are derived from the events. Recency is only tracked
+    when an observer asks for it with track_recency.
+    """
+    on_hit, on_miss, on_insert, on_evict, on_end = (
+        _callbacks(observers, name)
+        for name in ("on_hit", "on_miss", "on_insert", "on_evict", "on_end"))
+    recency = None
+    if any(getattr(o, "track_recency", False) for o in observers):
+        recency = _StackDistances()
+    inserted, frequency = {}, {}
+    step = -1
+    for step, event in enumerate(events):
+        r, hit, slot, replaced = event
+        if hit:
+            frequency[r] += 1
+            for callback in on_hit:
+                callback(step, r, slot)
+        else:
+            for callback in on_miss:
+                callback(step, r)
+            if replaced is not None:
+                age, count, rank = step - inserted.pop(replaced), frequency.pop(replaced), None
+                if recency is not None:
+                    rank = recency.rank(replaced)
+                    recency.remove(replaced)
+                for callback in on_evict:
+                    callback(step, replaced, slot, age, count, rank)
+            inserted[r], frequency[r] = step, 1
+            for callback in on_insert:
+                callback(step, r, slot)
+        if recency is not None:
+            recency.access(r)
+        yield event
+    for callback in on_end:
+        callback(step + 1)
+
+
+class EvictionAgeHistogram(CacheObserver):
+    """
+    Ages (steps in cache) of evicted keys, and with ranks=True their
+    recency ranks (LRU always evicts rank k, MRU rank 1).
+    """
+
+    def __init__(self, ranks=False):
+        self.ages = Counter()
+        self.ranks = Counter() if ranks else None
+        self.track_recency = ranks
+
+    def on_evict(self, step, key, slot, age, frequency, rank):
+        self.ages[age] += 1
+        if self.track_recency:
+            self.ranks[rank] += 1
+
+    @property
+    def evictions(self):
+        return sum(self.ages.values())
+
+    @property
+    def mean_age(self):
+        n = self.evictions
+        return sum(age * c for age, c in self.ages.items()) / n if n else 0
+
+    def log2_buckets(self):
+        """[(low, high, count)] over power-of-two age ranges low..high."""
+        buckets = Counter()
+        for age, c in self.ages.items():
+            buckets[age.bit_length()] += c
+        return [((1 << b) >> 1, (1 << b) - 1, buckets[b]) for b in sorted(buckets)]
+
+
+class KeyHitCounter(CacheObserver):
+    """Hits per key."""
+
+    def __init__(self):
+        self.hits = Counter()
+
+    def on_hit(self, step, key, slot):
+        self.hits[key] += 1
+
+    def most_common(self, n=None):
+        return self.hits.most_common(n)
+
+
+class TimeInCache(CacheObserver):
+    """
+    Steps each key spent cached, summed over all of its stays (`total`),
+    and the number of stays (`stays`). Keys still cached when the run ends
+    are counted up to the end.
+    """
+
+    def __init__(self):
+        self.total = Counter()
+        self.stays = Counter()
+        self._since = {}
+
+    def on_insert(self, step, key, slot):
+        self._since[key] = step
+        self.stays[key] += 1
+
+    def on_evict(self, step, key, slot, age, frequency, rank):
+        del self._since[key]
+        self.total[key] += age
+
+    def on_end(self, steps):
+        for key, since in self._since.items():
+            self.total[key] += steps - since
+        self._since.clear()
+
+    def mean_stay(self, key):
+        n = self.stays[key]
+        return self.total[key] / n if n else 0
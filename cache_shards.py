@@ -0,0 +1,356 @@
+"""
+SHARDS spatial sampling (Waldspurger et al., FAST '15) for huge traces.
+
+A key is sampled when its spatial hash falls below a threshold T out of a
+modulus P, so the sampling rate is R = T / P and every request to a sampled
+key is kept. Whole keys are kept or dropped, which preserves their reuse
+patterns: a cache of C slots behaves like a cache of R * C slots over the
+sampled trace.
+
+- shards() estimates the LRU miss ratio curve in one pass, scaling the
+  stack distances of sampled requests by 1 / R. With `max_keys` the rate
+  adapts (fixed-size SHARDS): once more keys are sampled than that, the
+  threshold is lowered to drop the keys with the largest hashes.
+- SpatialSample filters a trace once and runs any registered policy over
+  it with the cache size scaled to match.
+
+Both report error bounds for the sampling error of their estimates.
+
+    estimate = shards(requests, rate=0.01)
+    estimate.hit_rate(1024), estimate.interval(1024)
+
+    sample = SpatialSample(requests, max_keys=8192)
+    for policy in ("LRU", "ARC", "S3-FIFO"):
+        print(policy, sample.simulate(policy, 1024))
+"""
+import math
+import zlib
+from bisect import bisect_right
+from collections import Counter
+from heapq import heappop, heappush
+from statistics import NormalDist
+
+from cache_core import ENGINES, RunningMetrics, SimulationCancelled, _StackDistances, check_policies
+
+HASH_BITS = 24
+MODULUS = 1 << HASH_BITS  # P: spatial hashes are 0..P-1
+_GOLDEN = 0x9E3779B97F4A7C15
+_MIX1, _MIX2 = 0xBF58476D1CE4E5B9, 0x94D049BB133111EB
+_MASK64 = (1 << 64) - 1
+_SHIFT = 64 - HASH_BITS
+
+
+def spatial_hash(key):
+    """
+    Hash of a key in 0..MODULUS-1 (the splitmix64 finalizer), stable across
+    runs unlike hash() on strings. Small and sequential integer keys are
+    spread evenly, so no popular key is sampled by construction.
+    """
+    if not isinstance(key, int):
+        key = zlib.crc32(str(key).encode())
+    x = (key + _GOLDEN) & _MASK64
+    x = ((x ^ (x >> 30)) * _MIX1) & _MASK64
+    x = ((x ^ (x >> 27)) * _MIX2) & _MASK64
+    return (x ^ (x >> 31)) >> _SHIFT
+
+
+def _threshold(rate):
+    if not 0 < rate <= 1:
+        raise ValueError("the sampling rate must be in (0, 1]")
+    return max(1, round(rate * MODULUS))
+
+
+def _z(confidence):
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be in (0, 1)")
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def _size_spread(size, rate):
+    """Relative standard deviation of the number of sampled keys among `size` keys."""
+    return math.sqrt((1 - rate) / (rate * size))
+
+
+def _lower_threshold(heap, limit):
+    """
+    Pop the largest-hash keys off a heap of (-hash, key) until at most
+    `limit` remain; keys sharing a hash leave together. Returns the new
+    threshold (the largest hash dropped) and the dropped keys.
+    """
+    threshold, dropped = None, []
+    while len(heap) > limit:
+        threshold = -heap[0][0]
+        while heap and -heap[0][0] == threshold:
+            dropped.append(heappop(heap)[1])
+    return threshold, dropped
+
+
+# ---------------- Miss Ratio Curve Estimation ---------------- #
+class ShardsEstimate:
+    """
+    Result of shards(): a histogram of scaled stack distances, weighted by
+    1 / R at the time each request was sampled, plus the counters behind
+    the error bounds. Miss ratios are fractions, hit rates are percent.
+    """
+
+    def __init__(self, adjust=True):
+        self.adjust = adjust
+        self.requests = 0       # every request seen
+        self.sampled = 0        # requests to sampled keys
+        self.rate = 1.0         # final sampling rate
+        self.weight = 0.0       # estimated requests represented by the sample
+        self.histogram = Counter()  # scaled distance -> weight
+        self.key_weight_squares = 0.0
+        self._sizes = self._hits = None
+
+    def _cumulative(self):
+        if self._sizes is None:
+            self._sizes = sorted(self.histogram)
+            self._hits, total = [], 0.0
+            for size in self._sizes:
+                total += self.histogram[size]
+                self._hits.append(total)
+        return self._sizes, self._hits
+
+    def miss_ratio(self, size):
+        """Estimated LRU miss ratio of a cache of `size` slots."""
+        sizes, hits = self._cumulative()
+        i = bisect_right(sizes, size)
+        hit_weight = hits[i - 1] if i else 0.0
+        total = self.weight
+        if self.adjust and size >= 1:
+            # SHARDS-adj: the gap between the expected and the actual
+            # number of samples goes to the smallest distance
+            hit_weight += self.requests - self.weight
+            total = self.requests
+        if not total:
+            return 0.0
+        return min(1.0, max(0.0, 1 - hit_weight / total))
+
+    def hit_rate(self, size):
+        """Estimated LRU hit rate of a cache of `size` slots, in percent."""
+        return (1 - self.miss_ratio(size)) * 100
+
+    def miss_ratio_curve(self, max_size):
+        """Estimated miss ratios for sizes 1..max_size, like lru_miss_ratio_curve()."""
+        return [self.miss_ratio(size) for size in range(1, max_size + 1)]
+
+    def error_bound(self, size, confidence=0.95):
+        """
+        Half-width of a `confidence` interval on miss_ratio(size) from the
+        sampling of keys. It combines two sources of error:
+        - which keys are sampled: keys are the sampled units, so this grows
+          with the weight of the most requested keys. Without `adjust` the
+          estimate is a ratio of two sampled totals and both vary; with it
+          the sampled requests are not divided out, so their variance
+          falls on the estimated misses.
+        - how many: a reuse window of `size` keys holds a binomial number
+          of sampled ones, so the scaled distances are off by about
+          1 / sqrt(R * size). This counts as the change in the curve over
+          one standard deviation of that count.
+        With `adjust`, the gap between the expected and the actual number of
+        sampled requests is added on top: it is booked as hits, but when the
+        sample is short of a hot key those requests may as well be misses.
+        """
+        if not self.weight or self.rate >= 1 or size < 1:
+            return 0.0
+        m = self.miss_ratio(size)
+        spread = math.sqrt((1 - self.rate) * self.key_weight_squares)
+        if self.adjust:
+            # A key's estimated misses are at most its estimated requests
+            keys = spread / self.requests
+        else:
+            keys = max(m, 1 - m) * spread / self.weight
+        delta = _size_spread(size, self.rate)
+        count = (self.miss_ratio(size / (1 + delta)) - self.miss_ratio(size * (1 + delta))) / 2
+        bound = _z(confidence) * math.hypot(keys, count)
+        if self.adjust:
+            bound += abs(self.requests - self.weight) / self.requests
+        return min(1.0, bound)
+
+    def interval(self, size, confidence=0.95):
+        """(low, high) miss ratio of a cache of `size` slots."""
+        m, e = self.miss_ratio(size), self.error_bound(size, confidence)
+        return max(0.0, m - e), min(1.0, m + e)
+
+    def __repr__(self):
+        return (f"ShardsEstimate(requests={self.requests}, sampled={self.sampled}, "
+                f"rate={self.rate:.4g})")
+
+
+def shards(requests, rate=0.01, max_keys=None, adjust=True, cancel=None):
+    """
+    Estimate the LRU miss ratio curve of `requests` (any iterable) from a
+    spatial sample at `rate`. With `max_keys` the rate starts at `rate` and
+    is lowered whenever more than max_keys keys are sampled, so memory stays
+    bounded however many keys the trace has. `adjust` applies the SHARDS-adj
+    correction for sampling more or fewer requests than expected; turn it
+    off to divide by the sampled requests instead.
+    """
+    if max_keys is not None and max_keys < 1:
+        raise ValueError("max_keys must be at least 1")
+    threshold = _threshold(rate)
+    estimate = ShardsEstimate(adjust)
+    histogram = estimate.histogram
+    stack = _StackDistances()
+    key_weight = {}
+    heap = [] if max_keys is not None else None
+    weight = MODULUS / threshold
+    sampled = total = squares = 0
+    count = 0
+    for count, key in enumerate(requests, 1):
+        if cancel is not None and count % 4096 == 0 and cancel():
+            raise SimulationCancelled("SHARDS")
+        h = spatial_hash(key)
+        if h >= threshold:
+            continue
+        sampled += 1
+        total += weight
+        distance = stack.access(key)
+        previous = key_weight.get(key, 0.0)
+        key_weight[key] = previous + weight
+        squares += weight * (2 * previous + weight)
+        if distance:
+            histogram[max(1, round(distance * weight))] += weight
+        elif heap is not None:
+            heappush(heap, (-h, key))
+            if len(heap) > max_keys:
+                threshold, dropped = _lower_threshold(heap, max_keys)
+                for k in dropped:
+                    stack.remove(k)
+                    del key_weight[k]
+                weight = MODULUS / threshold
+    estimate.requests = count
+    estimate.sampled = sampled
+    estimate.rate = threshold / MODULUS
+    estimate.weight = total
+    estimate.key_weight_squares = squares
+    return estimate
+
+
+# ---------------- Sampled Policy Simulation ---------------- #
+class SampledEstimate:
+    """
+    Hit rate of a policy estimated from a SpatialSample: `hit_rate` and
+    `error` (half-width of the confidence interval) in percent, with the
+    RunningMetrics of the sampled run in `metrics`.
+    """
+
+    def __init__(self, policy, cache_size, sampled_cache_size, metrics, requests, hit_rate, error):
+        self.policy = policy
+        self.cache_size = cache_size
+        self.sampled_cache_size = sampled_cache_size
+        self.metrics = metrics
+        self.requests = requests
+        self.hit_rate = hit_rate
+        self.error = error
+
+    @property
+    def interval(self):
+        return max(0.0, self.hit_rate - self.error), min(100.0, self.hit_rate + self.error)
+
+    def __repr__(self):
+        return (f"SampledEstimate({self.policy}, cache_size={self.cache_size}, "
+                f"hit_rate={self.hit_rate:.2f}% ± {self.error:.2f})")
+
+
+class SpatialSample:
+    """
+    The requests of a trace whose keys hash below the sampling threshold,
+    kept in trace order. Give a fixed `rate`, or `max_keys` to pick the
+    largest rate that samples at most that many distinct keys (this needs
+    one extra pass over `requests`).
+    """
+
+    def __init__(self, requests, rate=0.01, max_keys=None):
+        if max_keys is not None:
+            if max_keys < 1:
+                raise ValueError("max_keys must be at least 1")
+            threshold = self._bottom_k_threshold(requests, max_keys)
+        else:
+            threshold = _threshold(rate)
+        self.rate = threshold / MODULUS
+        self.requests = []
+        append = self.requests.append
+        total = 0
+        for total, key in enumerate(requests, 1):
+            if spatial_hash(key) < threshold:
+                append(key)
+        self.total = total
+
+    @staticmethod
+    def _bottom_k_threshold(requests, max_keys):
+        heap, members = [], set()
+        threshold = MODULUS
+        for key in requests:
+            if key in members:
+                continue
+            h = spatial_hash(key)
+            if h >= threshold:
+                continue
+            members.add(key)
+            heappush(heap, (-h, key))
+            if len(heap) > max_keys:
+                threshold, dropped = _lower_threshold(heap, max_keys)
+                members.difference_update(dropped)
+        return threshold
+
+    def __len__(self):
+        return len(self.requests)
+
+    def scaled_size(self, cache_size):
+        """Cache size that plays the role of `cache_size` on the sampled trace."""
+        return max(1, round(cache_size * self.rate))
+
+    def _hit_rate(self, engine, size, options, adjust, metrics=None):
+        """Estimated hit ratio (a fraction) of one run over the sample."""
+        if metrics is None:
+            metrics = RunningMetrics()
+        update = metrics.update
+        for event in engine(self.requests, size, **options):
+            update(event[1], event[0])
+        if adjust:
+            expected = self.rate * self.total
+            return min(1.0, max(0.0, 1 - metrics.misses / expected)) if expected else 0.0
+        return metrics.hits / metrics.requests if metrics.requests else 0.0
+
+    def simulate(self, policy, cache_size, confidence=0.95, adjust=True, **options):
+        """
+        Run `policy` over the sample with a scaled cache; return a
+        SampledEstimate of its hit rate on the full trace. With `adjust`,
+        like SHARDS-adj, the sampled misses are divided by the expected
+        rather than the actual number of sampled requests; without it the
+        estimate is the sample's own hit ratio.
+
+        The error bound covers sampling error as ShardsEstimate.error_bound()
+        does: the choice of keys, treated as independent clusters of
+        requests, their number, measured by rerunning the policy with the
+        scaled cache one standard deviation of that number smaller and
+        larger (two more runs over the sample), and with `adjust` the gap
+        between the expected and the sampled requests.
+        """
+        check_policies([policy])
+        engine = ENGINES[policy]
+        size = self.scaled_size(cache_size)
+        metrics = RunningMetrics(per_key=True)
+        p = self._hit_rate(engine, size, options, adjust, metrics)
+        error = 0.0
+        if metrics.requests and self.rate < 1:
+            # How a key's requests split into hits and misses depends on the
+            # other sampled keys, so bound them by its request count
+            spread = math.sqrt((1 - self.rate) * sum(n * n for n in metrics.key_requests.values()))
+            if adjust:
+                keys = spread / (self.rate * self.total)
+            else:
+                keys = max(p, 1 - p) * spread / metrics.requests
+            delta = _size_spread(cache_size, self.rate)
+            smaller, larger = max(1, round(size / (1 + delta))), round(size * (1 + delta))
+            count = 0.0
+            if smaller != larger:
+                count = (self._hit_rate(engine, larger, options, adjust)
+                         - self._hit_rate(engine, smaller, options, adjust)) / 2
+            error = _z(confidence) * math.hypot(keys, count)
+            if adjust:
+                error += abs(1 - metrics.requests / (self.rate * self.total))
+            error = min(100.0, error * 100)
+        return SampledEstimate(policy, cache_size, size, metrics, self.total, p * 100, error)
@@ -0,0 +1,166 @@
+"""
+Parallel parameter sweeps.
+
+Fans (trace x policy x cache size) jobs out over a ProcessPoolExecutor and
+yields each result row as soon as its job finishes. Every trace is copied
+once into shared memory as an int64 array; workers attach to it by name
+instead of receiving a pickled copy per job. Binary trace files are simply
+memory-mapped by each worker.
+
+    for row in sweep({"web": requests}, ["LRU", "LFU"], [64, 128, 256]):
+        print(row)
+"""
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory, util
+
+from cache_core import check_policies, simulate
+from cache_trace import BinaryTrace, is_binary_trace, load_trace
+
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+class SharedTrace:
+    """
+    A trace copied into a shared memory block as int64 keys. Keys that are
+    not 64-bit integers are interned to dense ids first, and `keys` holds
+    the id -> key table (None when the keys are stored as they are). Only
+    W-TinyLFU looks at key values, through its sketch's hash; sweep()
+    hands it the table so it hashes the original keys. Call close() (or use
+    it as a context manager) to free the block.
+    """
+
+    def __init__(self, requests):
+        self.keys = None
+        if not all(isinstance(r, int) and INT64_MIN <= r <= INT64_MAX for r in requests):
+            ids = {}
+            requests = [ids.setdefault(r, len(ids)) for r in requests]
+            self.keys = list(ids)
+        keys = array("q", requests)
+        self.count = len(keys)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, self.count * 8))
+        self._shm.buf[:self.count * 8] = keys.tobytes()
+
+    @property
+    def handle(self):
+        """Picklable reference that workers use to attach."""
+        return ("shm", self._shm.name, self.count)
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Traces attached by this worker process, by handle
+_attached = {}
+# id -> key tables of interned traces, by handle; set once per worker
+_key_tables = {}
+
+
+def _set_key_tables(tables):
+    _key_tables.update(tables)
+
+
+def _detach_all():
+    for keys, source in _attached.values():
+        keys.release()
+        source.close()
+    _attached.clear()
+
+
+def _attach(handle):
+    trace = _attached.get(handle)
+    if trace is not None:
+        return trace[0]
+    if not _attached:
+        # Views must be released before the blocks are closed at worker exit
+        util.Finalize(None, _detach_all, exitpriority=10)
+    if handle[0] == "file":
+        binary = BinaryTrace(handle[1])
+        _attached[handle] = (binary.keys, binary)
+        return binary.keys
+    _, name, count = handle
+    # Pool workers share the parent's resource tracker, so attaching here does
+    # not take ownership: the parent still unlinks the block once.
+    shm = shared_memory.SharedMemory(name=name)
+    with shm.buf[:count * 8] as raw:
+        keys = raw.cast("q")
+    _attached[handle] = (keys, shm)
+    return keys
+
+
+def _run_job(trace_name, handle, policy, cache_size, options):
+    requests = _attach(handle)
+    if policy == "W-TinyLFU" and handle in _key_tables:
+        options = dict(options, keys=_key_tables[handle])
+    start = time.perf_counter()
+    metrics = simulate(policy, requests, cache_size, **options)
+    return {
+        "trace": trace_name,
+        "policy": policy,
+        "cache_size": cache_size,
+        "requests": metrics.requests,
+        "hits": metrics.hits,
+        "misses": metrics.misses,
+        "hit_rate": round(metrics.hit_rate, 4),
+        "seconds": round(time.perf_counter() - start, 6),
+    }
+
+
+def sweep(traces, policies, sizes, workers=None, options=None):
+    """
+    Run every (trace, policy, cache size) combination on `workers` processes
+    (default: all cores) and yield result rows as jobs complete.
+
+    traces  -- dict of name -> request sequence or trace file path; binary
+               traces are mapped by each worker, text traces are loaded
+               with load_trace() (a single sequence or path is accepted
+               as well)
+    options -- optional dict of policy name -> engine keyword arguments
+    """
+    if not isinstance(traces, dict):
+        traces = {"trace": traces}
+    check_policies(policies)
+    options = options or {}
+
+    shared, handles, key_tables = [], {}, {}
+    try:
+        for name, requests in traces.items():
+            if isinstance(requests, str):
+                if is_binary_trace(requests):
+                    handles[name] = ("file", os.path.abspath(requests))
+                    continue
+                requests = load_trace(requests)
+            trace = SharedTrace(requests)
+            shared.append(trace)
+            handles[name] = trace.handle
+            if trace.keys is not None:
+                key_tables[trace.handle] = trace.keys
+
+        # Key tables are pickled once per worker, not once per job
+        with ProcessPoolExecutor(max_workers=workers, initializer=_set_key_tables,
+                                 initargs=(key_tables,)) as pool:
+            # Larger caches and OPTIMAL tend to run longest; start them first
+            jobs = sorted(((name, policy, size) for name in handles
+                           for policy in policies for size in sizes),
+                          key=lambda job: (job[1] != "OPTIMAL", -job[2]))
+            futures = [pool.submit(_run_job, name, handles[name], policy, size,
+                                   options.get(policy, {}))
+                       for name, policy, size in jobs]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+    finally:
+        for trace in shared:
+            trace.close()
@@ -0,0 +1,323 @@
+"""
+Trace I/O for the cache simulator.
+
+Binary trace format (little-endian):
+
+    offset 0   magic      b"CTRC"
+           4   version    u8  (1)
+           5   key width  u8  (4 or 8 bytes, unsigned)
+           6   flags      u8  (bit 0: timestamps, bit 1: object sizes)
+           7   reserved   u8
+           8   count      u64
+          16   keys        count * key width
+               timestamps  count * u64   (if flagged)
+               sizes       count * u32   (if flagged)
+
+Every column starts on an 8-byte boundary. Columns are mapped with mmap and
+exposed as memoryviews (or numpy arrays), so the policies index the file
+directly without building Python lists.
+
+Text traces (whitespace-separated or CSV, optionally gzip-compressed) are
+read in chunks by iter_text_trace(), which yields keys one at a time.
+"""
+import csv
+import gzip
+import io
+import mmap
+import struct
+import sys
+from array import array
+from itertools import chain
+
+MAGIC = b"CTRC"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBBQ")
+HAS_TIMESTAMPS = 0x1
+HAS_SIZES = 0x2
+KEY_CODES = {4: "I", 8: "Q"}
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _is_numpy(values):
+    # numpy is optional and slow to import; an array can only come from it
+    # once something else has imported it
+    np = sys.modules.get("numpy")
+    return np is not None and isinstance(values, np.ndarray)
+
+
+def _column(values, code):
+    if isinstance(values, array) and values.typecode == code:
+        return values
+    if _is_numpy(values):
+        import numpy as np
+
+        # Whole-array cast to the little-endian file type, no per-key boxing
+        if values.size and values.dtype.kind == "i" and values.min() < 0:
+            raise OverflowError("can't convert negative value to unsigned int")
+        return np.ascontiguousarray(values, dtype=np.dtype(code).newbyteorder("<"))
+    return array(code, values)
+
+
+def _largest(values):
+    if _is_numpy(values):
+        return int(values.max())
+    return max(values)
+
+
+def write_binary_trace(path, keys, timestamps=None, sizes=None, key_width=None):
+    """
+    Write non-negative integer keys (plus optional timestamps and object
+    sizes) to `path` in the binary trace format. The key width defaults to
+    4 bytes when every key fits, 8 otherwise. Returns the number of records.
+    """
+    if key_width is None:
+        if not _is_numpy(keys):
+            keys = _column(keys, "Q")
+        key_width = 4 if not len(keys) or _largest(keys) < 1 << 32 else 8
+    if key_width not in KEY_CODES:
+        raise ValueError("key width must be 4 or 8 bytes")
+
+    columns = [_column(keys, KEY_CODES[key_width])]
+    flags = 0
+    if timestamps is not None:
+        flags |= HAS_TIMESTAMPS
+        columns.append(_column(timestamps, "Q"))
+    if sizes is not None:
+        flags |= HAS_SIZES
+        columns.append(_column(sizes, "I"))
+    count = len(columns[0])
+    if any(len(col) != count for col in columns):
+        raise ValueError("keys, timestamps and sizes must have the same length")
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, key_width, flags, 0, count))
+        for col in columns:
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            if sys.byteorder == "big" and isinstance(col, array):
+                col = array(col.typecode, col)
+                col.byteswap()
+            col.tofile(f)
+    return count
+
+
+class BinaryTrace:
+    """
+    A memory-mapped binary trace. `keys`, `timestamps` and `sizes` are
+    zero-copy memoryviews over the file (None when absent) and behave like
+    read-only sequences of ints. Use as a context manager, or call close()
+    once every view taken from it has been dropped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < HEADER.size:
+            raise ValueError(f"{path} is too short to be a binary trace")
+        magic, version, key_width, flags, _, count = HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary trace")
+        if version != VERSION or key_width not in KEY_CODES:
+            raise ValueError(f"{path}: unsupported trace version {version} / key width {key_width}")
+        self.count = count
+        self.key_width = key_width
+
+        self._layout = {}
+        offset = HEADER.size
+        for name, code, present in (("keys", KEY_CODES[key_width], True),
+                                    ("timestamps", "Q", flags & HAS_TIMESTAMPS),
+                                    ("sizes", "I", flags & HAS_SIZES)):
+            if present:
+                offset = _align(offset)
+                self._layout[name] = (offset, code)
+                offset += count * array(code).itemsize
+        if offset > len(self._mm):
+            raise ValueError(f"{path} is truncated")
+        if sys.byteorder == "big":
+            raise ValueError("binary traces can only be mapped on little-endian machines")
+
+        self._views = []
+        self.keys = self._view("keys")
+        self.timestamps = self._view("timestamps")
+        self.sizes = self._view("sizes")
+
+    def _view(self, name):
+        if name not in self._layout:
+            return None
+        offset, code = self._layout[name]
+        raw = memoryview(self._mm)[offset:offset + self.count * array(code).itemsize]
+        view = raw.cast(code)
+        self._views += [view, raw]
+        return view
+
+    def as_numpy(self, name="keys"):
+        """Zero-copy numpy view of a column (requires numpy)."""
+        try:
+            import numpy as np
+        except ImportError:
+            raise RuntimeError("numpy is required for as_numpy()") from None
+        if name not in self._layout:
+            return None
+        offset, code = self._layout[name]
+        dtype = {"I": "<u4", "Q": "<u8"}[code]
+        return np.frombuffer(self._mm, dtype=dtype, count=self.count, offset=offset)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        self.keys = self.timestamps = self.sizes = None
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_key(token):
+    """Trace keys are integers when they look like integers, strings otherwise."""
+    try:
+        return int(token)
+    except ValueError:
+        return token
+
+
+def _open_text(path):
+    """Open a text trace, transparently decompressing gzip; "-" is stdin."""
+    if path == "-":
+        return sys.stdin.buffer
+    f = open(path, "rb")
+    if f.peek(2)[:2] == b"\x1f\x8b":
+        return gzip.GzipFile(fileobj=f)
+    return f
+
+
+def iter_text_trace(path, column=None, delimiter=",", chunk_size=1 << 20, header=None):
+    """
+    Yield the keys of a text trace without loading the whole file.
+
+    With column=None the file is a stream of whitespace-separated keys,
+    read `chunk_size` bytes at a time. Otherwise it is a CSV file and the
+    key is taken from `column` (an index, or a header name). With an index,
+    `header` says whether the first row is a header to skip; by default it
+    is one when its key is not an integer but the next row's is.
+    """
+    f = _open_text(path)
+    try:
+        if column is None:
+            tail = b""
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                tokens = (tail + chunk).split()
+                # A token touching the end of the chunk may continue in the next one
+                tail = tokens.pop() if tokens and not chunk[-1:].isspace() else b""
+                yield from _parse_tokens(tokens)
+            if tail:
+                yield from _parse_tokens([tail])
+            return
+
+        reader = csv.reader(io.TextIOWrapper(f, newline=""), delimiter=delimiter)
+        if not isinstance(column, int):
+            column = next(reader, []).index(column)
+        elif header or header is None:
+            first = next(reader, None)
+            if header is None and first is not None:
+                second = next(reader, None)
+                rows = [] if second is None else [second]
+                if not (isinstance(_row_key(first, column), str)
+                        and isinstance(_row_key(second or [], column), int)):
+                    rows.insert(0, first)
+                reader = chain(rows, reader)
+        for row in reader:
+            key = _row_key(row, column)
+            if key is not None:
+                yield key
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+
+
+def _row_key(row, column):
+    if len(row) > column and row[column].strip():
+        return parse_key(row[column].strip())
+    return None
+
+
+def _parse_tokens(tokens):
+    try:
+        return list(map(int, tokens))
+    except ValueError:
+        return [parse_key(t.decode()) for t in tokens]
+
+
+def is_binary_trace(path):
+    if path == "-":
+        return False
+    with open(path, "rb") as f:
+        return f.read(4) == MAGIC
+
+
+def load_trace(path, column=None, delimiter=",", header=None):
+    """
+    Load a trace as a compact random-access sequence: a memory-mapped
+    memoryview for binary traces, an array("q") for integer text traces
+    (array("Q") once a key needs all 64 bits and none is negative) and a
+    list only when the keys do not fit either.
+    """
+    if is_binary_trace(path):
+        return BinaryTrace(path).keys
+    keys = iter_text_trace(path, column, delimiter, header=header)
+    compact = array("q")
+    append = compact.append
+    for key in keys:
+        if isinstance(key, int):
+            try:
+                append(key)
+                continue
+            except OverflowError:
+                # e.g. 64-bit hashed block ids
+                if compact.typecode == "q" and 0 <= key < 1 << 64 and \
+                        (not compact or min(compact) >= 0):
+                    compact = array("Q", compact)
+                    append = compact.append
+                    append(key)
+                    continue
+        return list(compact) + [key] + list(keys)
+    return compact
+
+
+def convert_to_binary(src, dst, column=None, delimiter=",", header=None):
+    """Convert a (possibly gzipped) text trace of integer keys to the binary format."""
+    keys = load_trace(src, column, delimiter, header)
+    if not isinstance(keys, array):
+        raise ValueError("only traces of integer keys can be stored in the binary format")
+    return write_binary_trace(dst, keys)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a text trace to the binary trace format.")
+    parser.add_argument("src", help="whitespace/CSV trace, optionally gzipped")
+    parser.add_argument("dst", help="binary trace to write")
+    parser.add_argument("--column", help="CSV column (index or header name) holding the key")
+    parser.add_argument("--delimiter", default=",")
+    parser.add_argument("--header", action=argparse.BooleanOptionalAction,
+                        help="whether the first CSV row is a header (default: detect)")
+    args = parser.parse_args()
+    col = int(args.column) if args.column and args.column.isdigit() else args.column
+    count = convert_to_binary(args.src, args.dst, col, args.delimiter, args.header)
+    print(f"wrote {count} records to {args.dst}")
@@ -0,0 +1,252 @@
+"""
+Synthetic workload generators.
+
+Every generator returns a NumPy array of non-negative integer keys (uint32
+when the keys fit, uint64 otherwise), built a block at a time with
+vectorized NumPy code, so traces of 100M requests take seconds. The same
+`seed` always gives the same trace. Arrays can be written straight to the
+binary trace format with save(), or turned into lists with .tolist() for
+the in-memory simulators.
+
+    keys = zipf(10_000_000, universe=100_000, alpha=0.9, seed=1)
+    save("zipf.bin", keys)
+
+From the command line:
+
+    python cache_workloads.py zipf zipf.bin -n 100000000 --universe 1000000 --alpha 0.9
+    python cache_workloads.py scan_mix mixed.bin -n 1000000 --hot-keys 500 --scan-length 2000
+"""
+import numpy as np
+
+from cache_trace import write_binary_trace
+
+_BLOCK = 1 << 22  # requests generated per vectorized step
+
+
+def _rng(seed):
+    return seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+
+def _empty(n, largest_key):
+    return np.empty(n, dtype=np.uint32 if largest_key < 1 << 32 else np.uint64)
+
+
+def _blocks(n):
+    for start in range(0, n, _BLOCK):
+        yield start, min(n, start + _BLOCK)
+
+
+def _zipf_sampler(universe, alpha):
+    """
+    Rejection-inversion sampler for Zipf ranks 0..universe-1 (Hormann and
+    Derflinger, 1996): O(1) per key, unlike a search through the CDF.
+    Returns draw(rng, count).
+    """
+    if abs(1 - alpha) < 1e-9:
+        integral, inverse = np.log, np.exp
+    else:
+        q = 1 - alpha
+
+        def integral(x):
+            return (np.power(x, q) - 1) / q
+
+        def inverse(y):
+            return np.power(np.maximum(1 + q * y, 0.0), 1 / q)
+
+    def density(x):
+        return np.power(x, -alpha)
+
+    low, high = integral(universe + 0.5), integral(1.5) - 1
+    squeeze = 2 - inverse(integral(2.5) - density(2.0))
+
+    def draw(rng, count):
+        u = low + rng.random(count) * (high - low)
+        x = inverse(u)
+        k = np.clip(np.floor(x + 0.5), 1, universe)
+        # Most draws pass the squeeze test; only the rest need the exact one
+        check = np.flatnonzero(k - x > squeeze)
+        if len(check):
+            kc = k[check]
+            rejected = check[u[check] < integral(kc + 0.5) - density(kc)]
+            if len(rejected):
+                k[rejected] = draw(rng, len(rejected)) + 1
+        return k.astype(np.int64) - 1
+
+    return draw
+
+
+def _popularity(universe, alpha):
+    """draw(rng, count) of keys 0..universe-1: Zipf(alpha), uniform for alpha=0."""
+    if alpha < 0:
+        raise ValueError("alpha must be non-negative")
+    if alpha == 0:
+        return lambda rng, count: rng.integers(0, universe, count)
+    return _zipf_sampler(universe, alpha)
+
+
+# ---------------- Independent Requests ---------------- #
+def zipf(n, universe, alpha=1.0, seed=None):
+    """Keys 0..universe-1 where key k is drawn with probability proportional to 1 / (k + 1) ** alpha."""
+    rng, draw = _rng(seed), _popularity(universe, alpha)
+    keys = _empty(n, universe - 1)
+    for start, stop in _blocks(n):
+        keys[start:stop] = draw(rng, stop - start)
+    return keys
+
+
+def uniform(n, universe, seed=None):
+    """Keys drawn uniformly from 0..universe-1."""
+    return zipf(n, universe, 0, seed)
+
+
+# ---------------- Scans and Loops ---------------- #
+def sequential(n, start=0):
+    """A scan of n distinct keys: start, start + 1, ..."""
+    keys = _empty(n, start + n)
+    keys[:] = np.arange(start, start + n)
+    return keys
+
+
+def loop(n, period, start=0):
+    """start .. start + period - 1, repeated: LRU's worst case once period > cache size."""
+    keys = _empty(n, start + period)
+    for begin, stop in _blocks(n):
+        keys[begin:stop] = np.arange(begin, stop) % period + start
+    return keys
+
+
+def scan_mix(n, hot_keys, hot_length=None, scan_length=None, alpha=1.0, seed=None):
+    """
+    Phases of `hot_length` Zipf requests over keys 0..hot_keys-1, each
+    followed by a scan of `scan_length` new keys (numbered from hot_keys up)
+    that are never requested again. Both lengths default to hot_keys.
+    """
+    hot_length = hot_keys if hot_length is None else hot_length
+    scan_length = hot_keys if scan_length is None else scan_length
+    period = hot_length + scan_length
+    rng, draw = _rng(seed), _popularity(hot_keys, alpha)
+    keys = _empty(n, hot_keys + (n // period + 1) * scan_length)
+    for start, stop in _blocks(n):
+        phase, offset = np.divmod(np.arange(start, stop), period)
+        block = keys[start:stop]
+        hot = offset < hot_length
+        block[hot] = draw(rng, int(hot.sum()))
+        scan = ~hot
+        block[scan] = hot_keys + phase[scan] * scan_length + offset[scan] - hot_length
+    return keys
+
+
+# ---------------- Locality Models ---------------- #
+def markov(n, universe, step=1, jump=0.01, seed=None):
+    """
+    Random walk over neighbouring keys (spatial locality): each request
+    moves up to `step` keys from the previous one, wrapping around the
+    universe, except that with probability `jump` it goes to a uniformly
+    drawn key instead.
+    """
+    rng = _rng(seed)
+    keys = _empty(n, universe - 1)
+    current = int(rng.integers(universe))
+    for start, stop in _blocks(n):
+        count = stop - start
+        moves = rng.integers(-step, step + 1, count)
+        jumps = rng.random(count) < jump
+        targets = rng.integers(0, universe, count)
+        moves[jumps] = 0
+        walked = np.cumsum(moves)
+        # Each request continues from the last jump at or before it
+        index = np.arange(count)
+        last = np.maximum.accumulate(np.where(jumps, index, -1))
+        since = last >= 0
+        base = np.where(since, targets[last], current)
+        offset = np.where(since, walked - walked[np.maximum(last, 0)], walked)
+        keys[start:stop] = (base + offset) % universe
+        current = int(keys[stop - 1])
+    return keys
+
+
+def temporal(n, universe, reuse=0.7, mean_distance=10, alpha=0.0, seed=None):
+    """
+    Temporal locality: with probability `reuse` a request repeats the one
+    d requests earlier, d geometric with mean `mean_distance`; otherwise it
+    draws a key from a Zipf(alpha) popularity (uniform for alpha=0).
+    """
+    if not 0 <= reuse < 1:
+        raise ValueError("reuse must be in [0, 1)")
+    if mean_distance < 1:
+        raise ValueError("mean_distance must be at least 1")
+    rng, draw = _rng(seed), _popularity(universe, alpha)
+    keys = _empty(n, universe - 1)
+    for start, stop in _blocks(n):
+        count = stop - start
+        position = np.arange(start, stop)
+        distance = rng.geometric(1 / mean_distance, count)
+        repeat = (rng.random(count) < reuse) & (distance <= position)
+        source = np.where(repeat, position - distance, position)
+        fresh = ~repeat
+        keys[position[fresh]] = draw(rng, int(fresh.sum()))
+        # Follow each chain of repeats back to a fresh request or to one
+        # from an earlier block, by pointer doubling: O(log chain length)
+        local = source - start
+        root = np.where(repeat & (local >= 0), local, np.arange(count))
+        while True:
+            nxt = root[root]
+            if np.array_equal(nxt, root):
+                break
+            root = nxt
+        origin = np.where(repeat[root], source[root], root + start)
+        keys[start:stop] = keys[origin]
+    return keys
+
+
+# ---------------- Output ---------------- #
+WORKLOADS = {
+    "zipf": zipf,
+    "uniform": uniform,
+    "sequential": sequential,
+    "loop": loop,
+    "scan_mix": scan_mix,
+    "markov": markov,
+    "temporal": temporal,
+}
+
+
+def save(path, keys):
+    """Write generated keys to `path` in the binary trace format; return the record count."""
+    return write_binary_trace(path, keys)
+
+
+if __name__ == "__main__":
+    import argparse
+    import inspect
+    import time
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic trace in the binary trace format.")
+    parser.add_argument("workload", choices=list(WORKLOADS))
+    parser.add_argument("output", help="binary trace to write")
+    parser.add_argument("-n", "--requests", type=int, default=1_000_000)
+    parser.add_argument("--universe", type=int, default=100_000, help="number of distinct keys")
+    parser.add_argument("--alpha", type=float, help="Zipf skew")
+    parser.add_argument("--period", type=int, help="loop length")
+    parser.add_argument("--start", type=int, help="first key of a scan or loop")
+    parser.add_argument("--hot-keys", type=int, help="hot set size (scan_mix)")
+    parser.add_argument("--hot-length", type=int, help="requests per hot phase (scan_mix)")
+    parser.add_argument("--scan-length", type=int, help="keys per scan (scan_mix)")
+    parser.add_argument("--step", type=int, help="largest random-walk move (markov)")
+    parser.add_argument("--jump", type=float, help="random-walk jump probability (markov)")
+    parser.add_argument("--reuse", type=float, help="repeat probability (temporal)")
+    parser.add_argument("--mean-distance", type=float, help="mean repeat distance (temporal)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generator = WORKLOADS[args.workload]
+    given = {"universe": args.universe, "period": args.period or args.universe,
+             "hot_keys": args.hot_keys or args.universe}
+    given.update({k: v for k, v in vars(args).items() if v is not None})
+    params = inspect.signature(generator).parameters
+    kwargs = {name: given[name] for name in params if name in given and name != "n"}
+    started = time.perf_counter()
+    keys = generator(args.requests, **kwargs)
+    count = save(args.output, keys)
+    print(f"wrote {count:,} {args.workload} requests to {args.output} "
+          f"in {time.perf_counter() - started:.1f}s")